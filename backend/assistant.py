@@ -1,38 +1,279 @@
-from openai import AzureOpenAI
 from dotenv import load_dotenv
 import os
+import asyncio
+import hashlib
 import json
+import logging
+import re
+from functools import lru_cache
+import numpy as np
+from cache import LRUCache
+from singleflight import SingleFlight, AsyncSingleFlight
+from embedding_cache import embedding_cache, embedding_key
+from metrics import track, record_usage
+from rate_limit import AdaptiveLimiter, is_throttled, INTERACTIVE, BATCH, BACKGROUND
 load_dotenv()
 version = "2024-10-21"
 key = os.getenv("CHAT_KEY")
 endpoint = os.getenv("CHAT_ENDPOINT")
-client = AzureOpenAI(
-    api_key=key,
-    api_version=version,
-    azure_endpoint=endpoint
-)
+EMBEDDINGS_MODEL = "text-embedding-ada-002"
+EMBEDDINGS_DIM = 1536
+logger = logging.getLogger(__name__)
 
 
-def get_response(history):
-    print(history)
-    response = client.chat.completions.create(
-        model="gpt-35-turbo",
-        messages=history
+# Clients are created on first use rather than at import, so the app starts
+# serving without waiting on them. The openai package itself is imported there
+# too; importing it costs more than the rest of the app put together.
+@lru_cache(maxsize=None)
+def get_client():
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=key,
+        api_version=version,
+        azure_endpoint=endpoint,
+        max_retries=0
     )
 
-    return response.choices[0].message.content.strip()
 
-
-def get_embeddings(description):
-    client = AzureOpenAI(
+@lru_cache(maxsize=None)
+def get_async_client():
+    import httpx
+    from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+    # One pooled HTTP connection shared by every async request, so chat turns
+    # reuse keep-alive sockets instead of handshaking per completion.
+    return AsyncAzureOpenAI(
         api_key=key,
         api_version=version,
-        azure_endpoint=os.getenv("EMBEDDINGS_URL")
+        azure_endpoint=endpoint,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
     )
 
-    response = client.embeddings.create(
-        input=description,
-        model="text-embedding-ada-002"
+
+@lru_cache(maxsize=None)
+def get_embeddings_client():
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=key,
+        api_version=version,
+        azure_endpoint=os.getenv("EMBEDDINGS_URL"),
+        max_retries=0
     )
-    return response
-    # return [item.embedding for item in response.data]
+
+
+CHAT_MODEL = "gpt-35-turbo"
+
+# Completions for prompts fully determined by their inputs (summaries, resume
+# tailoring). Call sites opt in with cache=True; chat turns never do.
+response_cache = LRUCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "2048")),
+    ttl=int(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+)
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+# Every call is admitted against the deployment's tokens-per-minute quota, most
+# urgent class first, and 429s are retried here (the clients' own retries are
+# off). Chat and embeddings are separate deployments with separate quotas.
+chat_limiter = AdaptiveLimiter(
+    "chat",
+    tokens_per_minute=int(os.getenv("CHAT_TPM", "120000")),
+    max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "32")),
+    latency_target=float(os.getenv("CHAT_LATENCY_TARGET", "15"))
+)
+embeddings_limiter = AdaptiveLimiter(
+    "embeddings",
+    tokens_per_minute=int(os.getenv("EMBEDDINGS_TPM", "240000")),
+    max_concurrency=int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "16")),
+    latency_target=float(os.getenv("EMBEDDINGS_LATENCY_TARGET", "5"))
+)
+# Tokens reserved for the answer, on top of the prompt, before the real usage is known.
+COMPLETION_TOKENS_ESTIMATE = 400
+
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+
+def prompt_key(model, messages, **params):
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def extract_json(text):
+    """
+    The JSON list or object in a model answer, ignoring code fences and any
+    prose around it; None if there is none that parses.
+    """
+    text = _FENCE_RE.sub('', text)
+    start = min((pos for pos in (text.find('['), text.find('{')) if pos != -1), default=-1)
+    end = max(text.rfind(']'), text.rfind('}'))
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+def completion_cost(history):
+    return sum(estimate_tokens(message['content']) for message in history) + COMPLETION_TOKENS_ESTIMATE
+
+
+def _complete(history, priority=BATCH):
+    logger.debug("Completion request: %s", history)
+
+    def call(ticket):
+        with track("openai", "completion"):
+            response = get_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=history
+            )
+        ticket.used = getattr(response.usage, 'total_tokens', None)
+        return response
+    response = chat_limiter.call(call, completion_cost(history), priority)
+    record_usage(CHAT_MODEL, response.usage)
+
+    return response.choices[0].message.content.strip()
+
+
+async def _complete_async(history, priority=INTERACTIVE):
+    logger.debug("Completion request: %s", history)
+
+    async def call(ticket):
+        with track("openai", "completion"):
+            response = await get_async_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=history
+            )
+        ticket.used = getattr(response.usage, 'total_tokens', None)
+        return response
+    response = await chat_limiter.call_async(call, completion_cost(history), priority)
+    record_usage(CHAT_MODEL, response.usage)
+
+    return response.choices[0].message.content.strip()
+
+
+def get_response(history, cache=False, priority=BATCH):
+    """
+    Completion text for ``history``. With ``cache=True`` the answer is reused
+    for identical prompts and concurrent identical prompts share one call.
+    ``priority`` is the limiter class the call waits in.
+    """
+    if not cache:
+        return _complete(history, priority)
+    key = prompt_key(CHAT_MODEL, history)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def call():
+        response = _complete(history, priority)
+        response_cache.set(key, response)
+        return response
+    return _flights.do(key, call)
+
+
+async def get_response_async(history, cache=False, priority=INTERACTIVE):
+    """Same as get_response, but awaits the completion without blocking the event loop."""
+    if not cache:
+        return await _complete_async(history, priority)
+    key = prompt_key(CHAT_MODEL, history)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def call():
+        response = await _complete_async(history, priority)
+        response_cache.set(key, response)
+        return response
+    return await _async_flights.do(key, call)
+
+
+def forget_response(history):
+    """Drop a cached completion, e.g. one the caller couldn't parse, so the next call asks again."""
+    response_cache.pop(prompt_key(CHAT_MODEL, history))
+
+
+async def _open_stream(history, priority):
+    """Start a streamed completion, holding a limiter slot; retries 429s before the first token."""
+    cost = completion_cost(history)
+    for attempt in range(chat_limiter.max_retries + 1):
+        ticket = await chat_limiter.acquire_async(cost, priority)
+        try:
+            stream = await get_async_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=history,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            return ticket, stream
+        except Exception as e:
+            chat_limiter.release(ticket, throttled=is_throttled(e))
+            if not is_throttled(e) or attempt == chat_limiter.max_retries:
+                raise
+            await asyncio.sleep(chat_limiter.backoff(attempt, e))
+        except BaseException:
+            chat_limiter.release(ticket)
+            raise
+
+
+async def stream_response(history, priority=INTERACTIVE):
+    """Yield the completion for ``history`` token by token as the model produces it."""
+    logger.debug("Streaming completion request: %s", history)
+    with track("openai", "stream"):
+        ticket, stream = await _open_stream(history, priority)
+        try:
+            async for chunk in stream:
+                # Azure sends a leading chunk with no choices (content filter results),
+                # and the usage comes in a final chunk with no choices either.
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    record_usage(CHAT_MODEL, usage)
+                    ticket.used = usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            chat_limiter.release(ticket)
+
+
+async def close_async_client():
+    if get_async_client.cache_info().currsize:
+        await get_async_client().close()
+
+
+def get_embeddings(description, priority=BATCH):
+    """
+    Embed a list of strings, returning a float32 matrix with one row per input.
+
+    Vectors are served from the embedding cache where possible; only the texts
+    that miss are sent to the API, deduplicated, in a single batched call.
+    """
+    if not description:
+        return np.empty((0, EMBEDDINGS_DIM), dtype=np.float32)
+    keys = [embedding_key(EMBEDDINGS_MODEL, text) for text in description]
+    cached = embedding_cache.get_many(set(keys))
+    misses = {}
+    for key, text in zip(keys, description):
+        if key not in cached:
+            misses[key] = text
+    if misses:
+        def call(ticket):
+            with track("openai", "embeddings"):
+                response = get_embeddings_client().embeddings.create(
+                    input=list(misses.values()),
+                    model=EMBEDDINGS_MODEL
+                )
+            ticket.used = getattr(response.usage, 'total_tokens', None)
+            return response
+        response = embeddings_limiter.call(call, sum(map(estimate_tokens, misses.values())), priority)
+        record_usage(EMBEDDINGS_MODEL, response.usage)
+        fetched = [(key, np.asarray(item.embedding, dtype=np.float32)) for key, item in zip(misses, response.data)]
+        embedding_cache.set_many(fetched)
+        cached.update(fetched)
+    return np.stack([cached[key] for key in keys])
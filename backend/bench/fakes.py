@@ -0,0 +1,314 @@
+"""
+Local stand-ins for every external service the backend calls, each with a
+configurable latency, so request paths can be timed without Azure, Cosmos,
+SQL Server or the job APIs.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import sys
+import time
+import types
+from datetime import datetime, timedelta
+import numpy as np
+
+EMBEDDING_DIM = 1536
+
+
+class Latency:
+    """Latency in seconds: a mean with uniform +/- jitter."""
+
+    def __init__(self, mean, jitter=0.2):
+        self.mean = mean
+        self.jitter = jitter
+
+    def sample(self):
+        return max(0.0, self.mean * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+    async def asleep(self):
+        await asyncio.sleep(self.sample())
+
+
+def ns(**kwargs):
+    return types.SimpleNamespace(**kwargs)
+
+
+def fake_completion_text(messages):
+    """A plausible answer for each prompt shape the backend sends."""
+    prompt = messages[-1]['content']
+    if 'pick a mood' in prompt and '\nConversation ' in prompt:
+        return json.dumps([{"index": idx, "mood": "neutral", "reason": "Talked about a regular shift.",
+                            "trigger": "workload"} for idx in range(prompt.count('\nConversation '))])
+    if 'pick a mood' in prompt:
+        return json.dumps({"mood": "neutral", "reason": "Talked about a regular shift.", "trigger": "workload"})
+    if 'tailor the resume' in prompt:
+        return "[Reliable server with strong customer focus]*['Customer service', 'POS systems', 'Teamwork']*" \
+               "[['Served 80 guests per shift', 'Trained new staff'], ['Kept stations stocked']]"
+    if 'reasonable accommodation' in prompt:
+        count = prompt.count('\nJob ')
+        return json.dumps([{"index": idx, "feasible": idx % 4 != 3} for idx in range(count)])
+    if 'Update the summary' in prompt:
+        return "The user talked about work and seemed calm."
+    return "That sounds like a full day. What was the best part of it?"
+
+
+def fake_embedding(text):
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    return np.random.default_rng(seed).normal(size=EMBEDDING_DIM).astype(np.float32).tolist()
+
+
+def usage(prompt_tokens, completion_tokens=0):
+    return ns(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+              total_tokens=prompt_tokens + completion_tokens)
+
+
+def count_tokens(messages):
+    return sum(len(message['content']) // 4 + 4 for message in messages)
+
+
+class FakeChatCompletions:
+    def __init__(self, latency, stream_chunks=20):
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+
+    def _response(self, messages):
+        text = fake_completion_text(messages)
+        return ns(choices=[ns(message=ns(content=text))],
+                  usage=usage(count_tokens(messages), len(text) // 4))
+
+    def create(self, model, messages, stream=False, **kwargs):
+        self.latency.sleep()
+        return self._response(messages)
+
+
+class FakeAsyncChatCompletions(FakeChatCompletions):
+    async def create(self, model, messages, stream=False, **kwargs):
+        if not stream:
+            await self.latency.asleep()
+            return self._response(messages)
+        return self._stream(messages)
+
+    async def _stream(self, messages):
+        # Time to first token is a fifth of the latency; the rest is spread over the chunks.
+        total = self.latency.sample()
+        await asyncio.sleep(total / 5)
+        text = fake_completion_text(messages)
+        words = text.split(' ')
+        step = max(1, len(words) // self.stream_chunks)
+        yield ns(choices=[])
+        for start in range(0, len(words), step):
+            await asyncio.sleep(total * 4 / 5 / self.stream_chunks)
+            piece = ' '.join(words[start:start + step]) + (' ' if start + step < len(words) else '')
+            yield ns(choices=[ns(delta=ns(content=piece))])
+
+
+class FakeEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, input, model, **kwargs):
+        self.latency.sleep()
+        return ns(data=[ns(embedding=fake_embedding(text)) for text in input],
+                  usage=usage(sum(len(text) // 4 for text in input)))
+
+
+class FakeOpenAI:
+    """Sync client exposing chat.completions and embeddings like AzureOpenAI."""
+
+    def __init__(self, chat_latency, embeddings_latency):
+        self.chat = ns(completions=FakeChatCompletions(chat_latency))
+        self.embeddings = FakeEmbeddings(embeddings_latency)
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, chat_latency):
+        self.chat = ns(completions=FakeAsyncChatCompletions(chat_latency))
+
+    async def close(self):
+        pass
+
+
+def sample_profile(id):
+    return {
+        'id': str(id),
+        'name': 'Sam Rivera',
+        'current_occupation': 'Waiter',
+        'disability': 'autism',
+        'state': 'Georgia',
+        'country': 'USA',
+        'phone': '+1 404 555 0100',
+        'summary': 'Waiter with five years of experience in busy restaurants, good with regulars and routines.',
+        'skills': ['Customer service', 'Order taking', 'Cash handling'],
+        'education': [{'degree': 'High School Diploma', 'field': 'General', 'institution': 'Atlanta High',
+                       'start_date': '2012', 'end_date': '2016'}],
+        'work_experience': [
+            {'role': 'Waiter', 'company': 'Peach Diner', 'start_date': '2019', 'end_date': 'Present',
+             'summary': ['Served guests', 'Handled payments']},
+            {'role': 'Busser', 'company': 'Midtown Grill', 'start_date': '2016', 'end_date': '2019',
+             'summary': ['Cleared tables']},
+        ],
+    }
+
+
+class FakeContainer:
+    """Cosmos container with point reads and upserts held in memory."""
+
+    def __init__(self, latency, items=None):
+        self.latency = latency
+        self.items = {str(key): dict(value) for key, value in (items or {}).items()}
+        self._version = 0
+        self._changes = []
+        self.client_connection = ns(last_response_headers={})
+
+    def _stamp(self, item):
+        self._version += 1
+        item['_etag'] = f'"{self._version}"'
+        item['_ts'] = int(time.time())
+        return item
+
+    def read_item(self, item, partition_key, etag=None, match_condition=None, **kwargs):
+        self.latency.sleep()
+        if item not in self.items:
+            self.items[item] = self._stamp(sample_profile(item))
+        stored = self.items[item]
+        if etag is not None and etag == stored['_etag']:
+            return {}
+        return copy.deepcopy(stored)
+
+    def upsert_item(self, body, **kwargs):
+        self.latency.sleep()
+        key = str(body.get('id') or body.get('session_id'))
+        self.items[key] = self._stamp(copy.deepcopy(body))
+        self._changes.append(key)
+        return copy.deepcopy(self.items[key])
+
+    def query_items_change_feed(self, continuation=None, start_time=None, **kwargs):
+        self.latency.sleep()
+        start = len(self._changes) if continuation is None else int(continuation)
+        headers = {'etag': str(len(self._changes))}
+        self.client_connection.last_response_headers = headers
+        changes = [copy.deepcopy(self.items[key]) for key in dict.fromkeys(self._changes[start:])]
+        if kwargs.get('response_hook'):
+            kwargs['response_hook'](headers, changes)
+        return changes
+
+
+def make_pyodbc(latency, emotion_rows=2000):
+    """A module standing in for pyodbc, backed by a generated eMOTION table."""
+    module = types.ModuleType('pyodbc')
+
+    class Error(Exception):
+        pass
+
+    module.Error = Error
+    module.OperationalError = type('OperationalError', (Error,), {})
+    module.InterfaceError = type('InterfaceError', (Error,), {})
+    module.pooling = True
+
+    moods = ['neutral', 'excited', 'anxious', 'frustrated', 'depressed']
+    start = datetime(2025, 1, 1)
+    rows = [(idx, idx % 25 + 1, 'Talked about a shift.', moods[idx % 5], start + timedelta(hours=idx))
+            for idx in range(emotion_rows)]
+    rows.reverse()
+
+    class Cursor:
+        rowcount = -1
+
+        def __init__(self):
+            self._rows = []
+
+        def execute(self, sql, *params):
+            latency.sleep()
+            text = sql.lstrip().upper()
+            if 'FROM EMOTION' in text and text.startswith('SELECT'):
+                limit = None
+                flat = params[0] if len(params) == 1 and isinstance(params[0], (list, tuple)) else params
+                if 'TOP (?)' in text:
+                    limit = flat[0]
+                matching = rows
+                if '(CREATED_DATE < ? OR' in text:
+                    # Keyset pagination: the cursor's (created_date, id) are the last parameters.
+                    after = (flat[-3], flat[-1])
+                    matching = [row for row in rows if (row[4], row[0]) < after]
+                self._rows = matching[:limit] if limit else list(matching)
+            elif text.startswith('SELECT 1'):
+                self._rows = [(1,)]
+            elif text.startswith('SELECT'):
+                self._rows = []
+            else:
+                self.rowcount = 1
+            return self
+
+        def executemany(self, sql, seq):
+            latency.sleep()
+            self.rowcount = len(seq)
+
+        def fetchall(self):
+            rows_, self._rows = self._rows, []
+            return rows_
+
+        def fetchone(self):
+            return self._rows.pop(0) if self._rows else None
+
+        def fetchmany(self, size):
+            batch, self._rows = self._rows[:size], self._rows[size:]
+            return batch
+
+        def close(self):
+            pass
+
+    class Connection:
+        autocommit = True
+
+        def cursor(self):
+            return Cursor()
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    def connect(*args, **kwargs):
+        latency.sleep()
+        return Connection()
+
+    module.connect = connect
+    return module
+
+
+def make_provider(name, latency, count=10):
+    titles = ['Waiter', 'Server', 'Host', 'Barista', 'Line Cook', 'Dishwasher', 'Cashier', 'Busser']
+
+    def fetch(job_title, location):
+        latency.sleep()
+        jobs = []
+        for idx in range(count):
+            title = titles[idx % len(titles)]
+            jobs.append({
+                'job_id': f'{name}-{job_title}-{idx}',
+                'title': title,
+                'company_name': f'Restaurant {idx}',
+                'location': location,
+                'via': name,
+                'description': f'{title} needed for a busy restaurant.',
+                'job_highlights': [
+                    {'title': 'Qualifications', 'items': [f'Experience as a {title.lower()}', 'Friendly with guests']},
+                    {'title': 'Responsibilities', 'items': ['Serve customers', 'Keep the floor tidy']},
+                ],
+            })
+        return jobs
+    return fetch
+
+
+def install_pyodbc(latency):
+    """Must run before the backend's db module is imported."""
+    sys.modules['pyodbc'] = make_pyodbc(latency)
@@ -0,0 +1,222 @@
+"""
+Offline load test for the backend.
+
+Every external service is replaced by a fake from bench.fakes with the given
+latency, the app is driven in-process over ASGI, and p50/p99 latency and
+throughput are reported per endpoint. Run from the backend directory:
+
+    python -m bench.run --concurrency 20 --requests 200
+    python -m bench.run --save bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json --max-regression 0.2
+
+With --baseline the exit status is 1 if any endpoint's p99 grew, or its
+throughput fell, by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from functools import lru_cache
+
+from bench import fakes
+
+ENDPOINTS = ['employee-chat', 'recommended_jobs', 'suggest_edits', 'emotions']
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def install_fakes(args):
+    """Point every external dependency at a fake; returns the imported app module."""
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    os.environ.update({
+        'EMBEDDING_CACHE_PATH': os.path.join(workdir, 'embeddings.sqlite'),
+        'JOB_VERDICT_CACHE_PATH': os.path.join(workdir, 'verdicts.sqlite'),
+        'JOB_INDEX_DIR': os.path.join(workdir, 'job_index'),
+        'RECOMMENDATION_STORE_PATH': os.path.join(workdir, 'recommendations.sqlite'),
+        'SESSION_BACKEND': 'memory',
+        'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+    })
+    sql = fakes.Latency(args.sql_latency)
+    fakes.install_pyodbc(sql)
+
+    import assistant
+    import cosmos_db
+    import job_aggregator
+    import main
+
+    chat = fakes.Latency(args.chat_latency)
+    embeddings = fakes.Latency(args.embeddings_latency)
+    sync_client = fakes.FakeOpenAI(chat, embeddings)
+    async_client = fakes.FakeAsyncOpenAI(chat)
+    cosmos = fakes.Latency(args.cosmos_latency)
+    profiles = fakes.FakeContainer(cosmos)
+    conversations = fakes.FakeContainer(cosmos)
+
+    # Keep the lru_cache wrappers: shutdown checks cache_info() before closing the client.
+    for module in (assistant, main):
+        module.get_client = lru_cache(maxsize=None)(lambda: sync_client)
+        module.get_async_client = lru_cache(maxsize=None)(lambda: async_client)
+        module.get_embeddings_client = lru_cache(maxsize=None)(lambda: sync_client)
+    for module in (cosmos_db, main):
+        module.get_profiles_container = lambda: profiles
+        module.get_conversations_container = lambda: conversations
+    job_aggregator.PROVIDERS = {
+        'google': fakes.make_provider('google', fakes.Latency(args.provider_latency)),
+        'adzuna': fakes.make_provider('adzuna', fakes.Latency(args.provider_latency)),
+    }
+    return main
+
+
+class Driver:
+    """Issues requests for one endpoint and records per-request latency."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.sessions = {}
+
+    async def request(self, worker):
+        start = time.perf_counter()
+        try:
+            response = await getattr(self, self.name.replace('-', '_'))(worker)
+            if response.status_code >= 400:
+                self.errors += 1
+        except Exception as e:
+            print(f"{self.name}: {e!r}", file=sys.stderr)
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - start)
+
+    async def employee_chat(self, worker):
+        # Each worker keeps one conversation going, like a user typing turn after turn.
+        body = {'message': 'Work was busy today but I handled it.', 'session_id': self.sessions.get(worker)}
+        response = await self.client.post(f'/employee-chat/{worker % 25 + 1}', json=body)
+        if response.status_code == 200:
+            self.sessions[worker] = response.json().get('session_id')
+        return response
+
+    async def recommended_jobs(self, worker):
+        return await self.client.get(f'/recommended_jobs/{worker % 25 + 1}')
+
+    async def suggest_edits(self, worker):
+        return await self.client.post(f'/suggest_edits/{worker % 25 + 1}',
+                                      params={'jd': f'Server for a busy restaurant, opening {worker % 5}'})
+
+    async def emotions(self, worker):
+        return await self.client.get('/emotions', params={'user_id': worker % 25 + 1, 'limit': 100})
+
+    def report(self, elapsed):
+        return {
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'mean_ms': round(statistics.fmean(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            'throughput_rps': round(len(self.latencies) / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+async def run_endpoint(client, name, concurrency, requests):
+    driver = Driver(client, name)
+    queue = asyncio.Queue()
+    for idx in range(requests):
+        queue.put_nowait(idx)
+
+    async def worker(worker_id):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await driver.request(worker_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(idx) for idx in range(concurrency)))
+    return driver.report(time.perf_counter() - start)
+
+
+async def run(args):
+    import httpx
+
+    main = install_fakes(args)
+    from job_index import job_index
+    await main.app.router.startup()
+    try:
+        # Wait for the startup refresh to fill the job corpus, as in production.
+        deadline = time.monotonic() + 30
+        while not len(job_index) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+            results = {}
+            for name in args.endpoints:
+                results[name] = await run_endpoint(client, name, args.concurrency, args.requests)
+        return results
+    finally:
+        await main.app.router.shutdown()
+
+
+def compare(results, baseline, max_regression):
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous['p99_ms'] and current['p99_ms'] > previous['p99_ms'] * (1 + max_regression):
+            failures.append(f"{name}: p99 {current['p99_ms']}ms vs baseline {previous['p99_ms']}ms")
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - max_regression):
+            failures.append(f"{name}: throughput {current['throughput_rps']}/s vs baseline {previous['throughput_rps']}/s")
+    return failures
+
+
+def print_table(results):
+    header = f"{'endpoint':<18}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, row in results.items():
+        print(f"{name:<18}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>10}{row['p99_ms']:>10}"
+              f"{row['throughput_rps']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--chat-latency', type=float, default=0.8, help='seconds per completion')
+    parser.add_argument('--embeddings-latency', type=float, default=0.15)
+    parser.add_argument('--cosmos-latency', type=float, default=0.01)
+    parser.add_argument('--sql-latency', type=float, default=0.01)
+    parser.add_argument('--provider-latency', type=float, default=1.0)
+    parser.add_argument('--save', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='compare against results saved with --save')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded mapping that evicts the least recently used key.
+
+    With ``ttl`` (seconds) set, entries also expire that long after they were stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            expires_at, value = self._data[key]
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class SqliteStore:
+    """
+    Persistent key-value store: a bounded in-memory LRU over a SQLite table.
+
+    Hot values are served from memory; every value is also written to the table
+    (through ``encode``/``decode``) so the store survives restarts. Thread-safe;
+    the file is opened in WAL mode so readers in other processes don't block.
+    """
+
+    def __init__(self, path, table, encode, decode, maxsize=1024, key_column="key", value_column="value"):
+        self.memory = LRUCache(maxsize)
+        self.encode = encode
+        self.decode = decode
+        self._table = table
+        self._key = key_column
+        self._value = value_column
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({key_column} TEXT PRIMARY KEY, {value_column} BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return {key: value} for every key found in either tier."""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            with self._lock:
+                # SQLite caps bound parameters per statement, so look up in chunks.
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT {self._key}, {self._value} FROM {self._table} "
+                        f"WHERE {self._key} IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = value = self.decode(blob)
+                        self.memory.set(key, value)
+        return found
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store an iterable of (key, value) pairs in both tiers."""
+        rows = []
+        for key, value in items:
+            self.memory.set(key, value)
+            rows.append((key, self.encode(value)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self._table} ({self._key}, {self._value}) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def items(self):
+        """Every stored (key, value) pair, read from the table."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {self._key}, {self._value} FROM {self._table}").fetchall()
+        return [(key, self.decode(blob)) for key, blob in rows]
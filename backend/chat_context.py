@@ -0,0 +1,77 @@
+from assistant import get_response_async, estimate_tokens, BATCH
+from models import SYSTEM_PROMPT
+
+# Prompt tokens allowed per chat completion (system prompt, summary and turns).
+CONTEXT_TOKEN_BUDGET = 3000
+# Once older turns must be folded, fold until the verbatim window is back under
+# this share of the turn budget, so summarization runs every few turns rather
+# than on every turn.
+COMPACT_TARGET = 0.5
+# The most recent turns are always sent verbatim, whatever their size.
+MIN_RECENT_MESSAGES = 2
+
+
+def system_message(session):
+    content = SYSTEM_PROMPT
+    if session.profile_note:
+        content += f"\n{session.profile_note}"
+    if session.summary:
+        content += f"\n\nSummary of the conversation so far: {session.summary}"
+    return {'role': 'system', 'content': content}
+
+
+def turn_budget(session, budget):
+    return budget - estimate_tokens(system_message(session)['content'])
+
+
+def build_context(session, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Messages to send for the next completion: the system prompt with the profile
+    and running summary, followed by as many recent turns as fit in the budget.
+    """
+    turns = session.messages[session.summarized_upto:]
+    remaining = turn_budget(session, budget)
+    start = len(turns)
+    while start > 0:
+        cost = estimate_tokens(turns[start - 1]['content'])
+        if cost > remaining and len(turns) - start >= MIN_RECENT_MESSAGES:
+            break
+        remaining -= cost
+        start -= 1
+    return [system_message(session)] + [turn.as_dict() for turn in turns[start:]]
+
+
+async def compact_context(session, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Fold the oldest verbatim turns into the session's running summary once they
+    no longer fit the budget. Only the newly folded turns and the previous
+    summary go to the model, so each update costs the same however long the
+    conversation has run.
+
+    Returns the new ``(summary, summarized_upto)``, or None if nothing needs
+    folding. The session isn't modified: the caller applies the result to
+    whichever copy of the session is current by then.
+    """
+    turns = session.messages[session.summarized_upto:]
+    limit = turn_budget(session, budget)
+    total = sum(estimate_tokens(turn['content']) for turn in turns)
+    if total <= limit:
+        return None
+
+    fold = 0
+    while total > limit * COMPACT_TARGET and len(turns) - fold > MIN_RECENT_MESSAGES:
+        total -= estimate_tokens(turns[fold]['content'])
+        fold += 1
+    if not fold:
+        return None
+
+    transcript = '\n'.join(f"{turn['role']}: {turn['content']}" for turn in turns[:fold])
+    prompt = [{'role': 'user', 'content': f"Here is the summary of a supportive conversation so far: "
+                                          f"{session.summary or '(none yet)'}\n\n"
+                                          f"Here are the next messages:\n{transcript}\n\n"
+                                          f"Update the summary to include the new messages. Keep details about the "
+                                          f"user's mood, the events and people they mentioned, and anything they "
+                                          f"asked to be remembered. Return only the summary, under 150 words."}]
+    # Runs after the reply has been sent, so it needn't compete with live turns.
+    summary = await get_response_async(prompt, priority=BATCH)
+    return summary, session.summarized_upto + fold
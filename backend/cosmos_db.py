@@ -1,31 +1,186 @@
 from azure.cosmos import CosmosClient, exceptions, PartitionKey
+from azure.core import MatchConditions
 from dotenv import load_dotenv
+from cache import LRUCache
+from metrics import track
+import copy
+from functools import lru_cache
+import logging
 import os
+import threading
+import time
 load_dotenv()
 url = os.getenv("DB_URL")
 key = os.getenv("DB_KEY")
-client = CosmosClient(url, credential=key)
 DATABASE_NAME = 'Interactions'
 CONTAINER_NAME = 'Conversations'
-db = client.create_database_if_not_exists(DATABASE_NAME)
-db = client.get_database_client(DATABASE_NAME)
-container = db.create_container_if_not_exists(id=CONTAINER_NAME, partition_key=PartitionKey(path="/session_id"))
-user_profile = db.create_container_if_not_exists(id='Profiles', partition_key=PartitionKey(path="/id"))
-
-
-def upsert_conversation(session):
-    success_count = 0
-    failed_sessions = []
-    print(session)
-    try:
-        container.upsert_item(session)
-        success_count += 1
-        print('*'*100)
-        print('uploaded susccessfully')
-    except exceptions.CosmosHttpResponseError as e:
-        failed_sessions.append(session['session_id'])
-        raise Exception(f"Failed to upload session {session['session_id']}: {e}")
+logger = logging.getLogger(__name__)
+
+
+# The client, database and containers are created on first use rather than at
+# import; the CosmosClient constructor alone makes a network call.
+@lru_cache(maxsize=None)
+def get_database():
+    client = CosmosClient(url, credential=key)
+    client.create_database_if_not_exists(DATABASE_NAME)
+    return client.get_database_client(DATABASE_NAME)
+
+
+@lru_cache(maxsize=None)
+def get_conversations_container():
+    return get_database().create_container_if_not_exists(id=CONTAINER_NAME, partition_key=PartitionKey(path="/session_id"))
+
+
+@lru_cache(maxsize=None)
+def get_profiles_container():
+    return get_database().create_container_if_not_exists(id='Profiles', partition_key=PartitionKey(path="/id"))
+
+
+class ConversationWriter:
+    """
+    Write-behind buffer for conversation snapshots.
+
+    Snapshots are keyed by session_id, so repeated saves of a session between
+    flushes collapse into one upsert of the latest state. A background thread
+    flushes when batch_size sessions are pending or flush_interval seconds have
+    passed. Once max_pending sessions are waiting, offer() refuses new ones and
+    put() blocks until the writer catches up.
+    """
+
+    def __init__(self, write, batch_size=50, flush_interval=5.0, max_pending=1000):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def offer(self, snapshot):
+        """Queue a snapshot without blocking. Returns False if the buffer is full."""
+        with self._cond:
+            return self._add(snapshot)
+
+    def put(self, snapshot, timeout=None):
+        """Queue a snapshot, waiting for room if the buffer is full."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._add(snapshot), timeout):
+                raise TimeoutError("Conversation write buffer is full")
+
+    def close(self):
+        """Write everything still pending and stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+
+    def _add(self, snapshot):
+        if self._closed:
+            raise RuntimeError("Conversation writer is closed")
+        session_id = snapshot['session_id']
+        if session_id not in self._pending and len(self._pending) >= self.max_pending:
+            return False
+        self._pending[session_id] = snapshot
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+            self._thread.start()
+        if len(self._pending) >= self.batch_size:
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size, self.flush_interval
+                )
+                if self._closed and not self._pending:
+                    self._cond.notify_all()
+                    return
+                batch = [self._pending.pop(key) for key in list(self._pending)[:self.batch_size]]
+                self._cond.notify_all()
+            retry = self._write_batch(batch)
+            with self._cond:
+                for snapshot in retry:
+                    # A newer snapshot queued meanwhile supersedes the failed one.
+                    self._pending.setdefault(snapshot['session_id'], snapshot)
+                self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        retry = []
+        for snapshot in batch:
+            try:
+                self.write(snapshot)
+            except exceptions.CosmosHttpResponseError as e:
+                logger.warning("Failed to upload session %s: %s", snapshot['session_id'], e)
+                # Throttling and server errors are worth another attempt; anything else would fail again.
+                if (e.status_code == 429 or (e.status_code or 0) >= 500) and not self._closed:
+                    retry.append(snapshot)
+            except Exception:
+                logger.exception("Failed to upload session %s", snapshot['session_id'])
+        return retry
+
+
+def write_conversation(snapshot):
+    with track("cosmos", "upsert_conversation"):
+        get_conversations_container().upsert_item(snapshot)
+
+
+conversation_writer = ConversationWriter(write_conversation)
+
+
+# Profiles are served from here for PROFILE_TTL seconds; after that the entry is
+# revalidated with its ETag, which costs a round-trip but no body transfer.
+PROFILE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "60"))
+profile_cache = LRUCache(maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "1024")))
+
+
+def get_profile(id):
+    """Read-through cached point read of a profile. Returns a copy the caller may modify."""
+    entry = profile_cache.get(id)
+    if entry is not None and time.monotonic() - entry[1] < PROFILE_TTL:
+        return copy.deepcopy(entry[0])
+    if entry is None:
+        with track("cosmos", "read_profile"):
+            profile = get_profiles_container().read_item(id, partition_key=id)
+    else:
+        with track("cosmos", "revalidate_profile"):
+            profile = get_profiles_container().read_item(
+                id, partition_key=id, etag=entry[0]['_etag'], match_condition=MatchConditions.IfModified
+            )
+        # A 304 Not Modified comes back with an empty body: keep the cached copy.
+        if not profile:
+            profile = entry[0]
+    profile_cache.set(id, (profile, time.monotonic()))
+    return copy.deepcopy(profile)
 
 
 def upsert_profile(profile):
-    user_profile.upsert_item(profile)
\ No newline at end of file
+    with track("cosmos", "upsert_profile"):
+        saved = get_profiles_container().upsert_item(profile)
+    profile_cache.set(saved['id'], (saved, time.monotonic()))
+    return saved
+
+
+def profile_changes(continuation=None):
+    """
+    Profiles written since ``continuation``, read from the container's change
+    feed, with the token to resume from next time. Without a token the feed
+    starts from now.
+    """
+    container = get_profiles_container()
+    options = {'continuation': continuation} if continuation else {'start_time': 'Now'}
+    # The client's last_response_headers is shared with every other request on
+    # this connection, so keep the headers handed to this call's own hook. The
+    # last page fetched carries the token to resume from.
+    headers = {}
+
+    def keep_headers(response_headers, _result):
+        nonlocal headers
+        headers = response_headers
+
+    with track("cosmos", "profile_change_feed"):
+        profiles = list(container.query_items_change_feed(response_hook=keep_headers, **options))
+    return profiles, headers.get('etag')
\ No newline at end of file
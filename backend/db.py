@@ -1,6 +1,14 @@
+import asyncio
+import functools
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import pyodbc
+from metrics import track
 load_dotenv()
 
 server_name = os.getenv("USER_DB_SERVER_NAME")
@@ -19,31 +27,111 @@ conn_str = (
     "Connection Timeout=30;"
 )
 
-conn = None  # Define conn before the try block
+POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "10"))
+# Connections idle for longer than this are pinged before being handed out.
+HEALTH_CHECK_AFTER = 30
 
-try:
-    conn = pyodbc.connect(conn_str, autocommit=True)  # Keep the connection open with autocommit enabled
-    print("Connected successfully!")
 
-    cursor = conn.cursor()  # Only create cursor if connection succeeds
+class ConnectionPool:
+    """
+    Fixed-size pool of pyodbc connections, opened on demand.
 
-    # cursor.execute("""
-    #     IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Emotion' AND xtype='U')
-    #     CREATE TABLE Emotion (
-    #         user_id INT,
-    #         reason nvarchar(2000),
-    #         emotion nvarchar(200)
-    #     )
-    # """)
-    # conn.commit()
+    At most ``size`` connections are checked out at once; further callers wait
+    up to ``timeout`` seconds. A connection that sat idle for longer than
+    HEALTH_CHECK_AFTER is checked with ``SELECT 1`` before reuse and replaced
+    if it fails, and one that raised a connection-level error is discarded.
+    """
 
-    result = cursor.execute("SELECT * FROM eMOTION;")
-    print(result.fetchall())
+    def __init__(self, conn_str, size=POOL_SIZE, timeout=30):
+        self.conn_str = conn_str
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
 
-except Exception as e:
-    print("Error:", e)
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No SQL connection available after {self.timeout}s")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except (pyodbc.OperationalError, pyodbc.InterfaceError):
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
 
-finally:
-    if conn:  # Don't close the connection explicitly to return it to the pool
-        # conn.close()  # Optional: comment this out for connection pooling
-        pass  # Connection will be automatically managed by the pool
+    def _checkout(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return pyodbc.connect(self.conn_str, autocommit=True)
+            if time.monotonic() - last_used < HEALTH_CHECK_AFTER or self._healthy(conn):
+                return conn
+            self._discard(conn)
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.cursor().execute("SELECT 1").fetchone()
+            return True
+        except pyodbc.Error:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+
+pool = ConnectionPool(conn_str)
+# Blocking queries run here, sized to the pool, so async handlers never wait on a socket.
+executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="sql")
+
+
+def execute(sql, params=()):
+    """Run a statement on a pooled connection and return the affected row count."""
+    with track("sql", "execute"), pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+
+def fetchall(sql, params=()):
+    with track("sql", "fetchall"), pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def ping():
+    fetchall("SELECT 1")
+
+
+async def run_in_executor(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
+async def execute_async(sql, params=()):
+    return await run_in_executor(execute, sql, params)
+
+
+async def fetchall_async(sql, params=()):
+    return await run_in_executor(fetchall, sql, params)
@@ -0,0 +1,28 @@
+import hashlib
+import os
+import numpy as np
+from cache import SqliteStore
+
+
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+# Two-tier embedding cache keyed by sha256(model, text): hot vectors in memory,
+# every vector in a SQLite file as a float32 blob so the cache survives restarts.
+embedding_cache = SqliteStore(
+    os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite"),
+    "embeddings",
+    encode=encode_vector,
+    decode=decode_vector,
+    maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+    value_column="vector"
+)
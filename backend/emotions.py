@@ -0,0 +1,158 @@
+import base64
+import json
+from datetime import datetime
+
+EMOTION_COLUMNS = "id, user_id, reason, emotion, created_date"
+
+# Categories the mood analysis picks a trigger from, so the heatmap can be counted.
+TRIGGERS = ['workload', 'deadlines', 'coworkers', 'manager', 'customers', 'commute',
+            'health', 'personal life', 'accommodations', 'other']
+
+# Records a batch of analysed sessions and bumps every rollup in one
+# transaction, so the rollups never drift from eMOTION. Rows are staged in a
+# table variable and each rollup takes one MERGE over the batch, keyed on the
+# same day eMOTION stamps.
+RECORD_EMOTIONS_BATCH_SQL = """
+SET NOCOUNT ON;
+SET XACT_ABORT ON;
+DECLARE @rows TABLE (seq INT NOT NULL, user_id INT NOT NULL, reason NVARCHAR(2000), mood NVARCHAR(200),
+                     trigger_category NVARCHAR(100));
+INSERT INTO @rows (seq, user_id, reason, mood, trigger_category) VALUES {values};
+DECLARE @now DATETIME = GETDATE();
+DECLARE @day DATE = CAST(@now AS DATE);
+BEGIN TRANSACTION;
+
+INSERT INTO eMOTION (user_id, reason, emotion) SELECT user_id, reason, mood FROM @rows ORDER BY seq;
+
+MERGE EmotionDaily WITH (HOLDLOCK) AS t
+USING (SELECT user_id, @day AS day, mood, COUNT(*) AS entries FROM @rows GROUP BY user_id, mood) AS s
+ON t.user_id = s.user_id AND t.day = s.day AND t.mood = s.mood
+WHEN MATCHED THEN UPDATE SET entries = t.entries + s.entries
+WHEN NOT MATCHED THEN INSERT (user_id, day, mood, entries) VALUES (s.user_id, s.day, s.mood, s.entries);
+
+MERGE EmotionDailyTrigger WITH (HOLDLOCK) AS t
+USING (SELECT user_id, @day AS day, mood, trigger_category, COUNT(*) AS entries FROM @rows
+       GROUP BY user_id, mood, trigger_category) AS s
+ON t.user_id = s.user_id AND t.day = s.day AND t.mood = s.mood AND t.trigger_category = s.trigger_category
+WHEN MATCHED THEN UPDATE SET entries = t.entries + s.entries
+WHEN NOT MATCHED THEN INSERT (user_id, day, mood, trigger_category, entries)
+    VALUES (s.user_id, s.day, s.mood, s.trigger_category, s.entries);
+
+MERGE EmotionLatest WITH (HOLDLOCK) AS t
+USING (SELECT user_id, mood, reason, trigger_category FROM (
+           SELECT *, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY seq DESC) AS rn FROM @rows
+       ) AS r WHERE rn = 1) AS s
+ON t.user_id = s.user_id
+WHEN MATCHED THEN UPDATE SET mood = s.mood, reason = s.reason, trigger_category = s.trigger_category,
+    created_date = @now
+WHEN NOT MATCHED THEN INSERT (user_id, mood, reason, trigger_category, created_date)
+    VALUES (s.user_id, s.mood, s.reason, s.trigger_category, @now);
+
+COMMIT TRANSACTION;
+"""
+# SQL Server allows 2100 parameters per statement and 1000 rows per VALUES list.
+MAX_BATCH_ROWS = 400
+
+
+def record_emotions_batch(records):
+    """SQL and parameters recording (user_id, reason, mood, trigger) records in one transaction."""
+    if not 0 < len(records) <= MAX_BATCH_ROWS:
+        raise ValueError(f"Expected 1 to {MAX_BATCH_ROWS} records, got {len(records)}")
+    params = []
+    for seq, record in enumerate(records):
+        params.append(seq)
+        params.extend(record_emotion_params(*record))
+    values = ', '.join(['(?, ?, ?, ?, ?)'] * len(records))
+    return RECORD_EMOTIONS_BATCH_SQL.format(values=values), params
+
+
+def normalize_trigger(trigger):
+    trigger = str(trigger or '').strip().lower()
+    return trigger if trigger in TRIGGERS else 'other'
+
+
+def record_emotion_params(user_id, reason, mood, trigger):
+    return int(user_id), reason, mood, normalize_trigger(trigger)
+
+
+def range_filter(user_id=None, start=None, end=None, column="day"):
+    """WHERE clause and params for the rollup endpoints."""
+    clauses, params = [], []
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{column} < ?")
+        params.append(end)
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def daily_query(user_id=None, start=None, end=None):
+    where, params = range_filter(user_id, start, end)
+    return f"SELECT user_id, day, mood, entries FROM EmotionDaily{where} ORDER BY day, user_id, mood;", params
+
+
+def trigger_query(user_id=None, start=None, end=None):
+    where, params = range_filter(user_id, start, end)
+    return (f"SELECT trigger_category, mood, SUM(entries) FROM EmotionDailyTrigger{where} "
+            f"GROUP BY trigger_category, mood ORDER BY trigger_category, mood;"), params
+
+
+LATEST_QUERY = "SELECT user_id, mood, reason, trigger_category, created_date FROM EmotionLatest ORDER BY user_id;"
+
+
+def encode_cursor(created_date, id):
+    raw = json.dumps([created_date.isoformat(), id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        created_date, id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_date), int(id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def emotion_query(user_id=None, start=None, end=None, after=None, limit=None):
+    """
+    SELECT for eMOTION rows, newest first, keyset-paginated on (created_date, id).
+
+    ``after`` is the (created_date, id) of the last row already seen; only the
+    filters actually given go into the WHERE clause so each shape gets its own
+    plan and can seek on the (user_id, created_date, id) index.
+    """
+    clauses, params = [], []
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if start is not None:
+        clauses.append("created_date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("created_date < ?")
+        params.append(end)
+    if after is not None:
+        clauses.append("(created_date < ? OR (created_date = ? AND id < ?))")
+        params.extend([after[0], after[0], after[1]])
+    top = ""
+    if limit is not None:
+        top = "TOP (?) "
+        params.insert(0, limit)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT {top}{EMOTION_COLUMNS} FROM eMOTION{where} ORDER BY created_date DESC, id DESC;"
+    return sql, params
+
+
+def row_to_dict(row):
+    return {
+        "id": row[0],
+        "user_id": row[1],
+        "reason": row[2],
+        "emotion": row[3],
+        "created_date": row[4].isoformat(),
+    }
@@ -0,0 +1,108 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from cache import LRUCache
+from metrics import track
+from job_listings import get_google_listings, get_adzuna_listings, adzuna_to_listing
+
+
+def fetch_google(job_title, location):
+    return get_google_listings(job_title, location, timeout=PROVIDER_TIMEOUTS["google"])
+
+
+def fetch_adzuna(job_title, location):
+    listings = get_adzuna_listings(job_title, location, timeout=PROVIDER_TIMEOUTS["adzuna"])
+    return [adzuna_to_listing(result) for result in listings]
+
+
+# Providers in merge priority order: when a posting appears on several, the
+# first provider's copy is kept and the others only fill in missing fields.
+PROVIDERS = {
+    "google": fetch_google,
+    "adzuna": fetch_adzuna,
+}
+PROVIDER_TIMEOUTS = {
+    "google": 10,
+    "adzuna": 6,
+}
+LISTINGS_TTL = 10 * 60
+
+listings_cache = LRUCache(maxsize=256, ttl=LISTINGS_TTL)
+# Long-lived pool. Waiting on a future stops at the provider's timeout but the
+# thread runs on, so each fetch passes the same timeout to its HTTP client:
+# a stalled provider frees its thread about when the response gives up on it.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="job-provider")
+
+logger = logging.getLogger(__name__)
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(value):
+    value = _TAG_RE.sub(" ", str(value or "")).lower()
+    return _NON_ALNUM_RE.sub(" ", value).strip()
+
+
+def dedup_key(job):
+    """Identity of a posting across providers: normalized title, company and city."""
+    city = str(job.get("location") or "").split(",")[0]
+    return normalize_text(job.get("title")), normalize_text(job.get("company_name")), normalize_text(city)
+
+
+def merge_listings(results):
+    """Merge per-provider listing lists, collapsing postings that share a dedup_key."""
+    merged = {}
+    for provider, jobs in results:
+        for job in jobs:
+            key = dedup_key(job)
+            if key not in merged:
+                merged[key] = dict(job, sources=[provider])
+                continue
+            existing = merged[key]
+            if provider not in existing["sources"]:
+                existing["sources"].append(provider)
+            for field, value in job.items():
+                if not existing.get(field):
+                    existing[field] = value
+    return list(merged.values())
+
+
+def fetch_tracked(name, fetch, job_title, location):
+    with track("jobs", name):
+        return fetch(job_title, location)
+
+
+def aggregate_listings(job_title, location):
+    """
+    Query every provider concurrently and return the merged, de-duplicated listings.
+
+    Each provider gets its own timeout; a provider that errors or runs late is
+    skipped. Results are cached per (query, location) for LISTINGS_TTL seconds,
+    but only when at least one provider answered.
+    """
+    cache_key = (normalize_text(job_title), normalize_text(location))
+    cached = listings_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    start = time.monotonic()
+    futures = {name: _executor.submit(fetch_tracked, name, fetch, job_title, location) for name, fetch in PROVIDERS.items()}
+    results = []
+    for name, future in futures.items():
+        remaining = PROVIDER_TIMEOUTS[name] - (time.monotonic() - start)
+        try:
+            results.append((name, future.result(timeout=max(remaining, 0))))
+        except FutureTimeoutError:
+            logger.warning("Job provider %s timed out after %ss", name, PROVIDER_TIMEOUTS[name])
+        except Exception as e:
+            logger.warning("Job provider %s failed: %s", name, e)
+
+    jobs = merge_listings(results)
+    # Providers raise on failure, so results only holds real answers: if every
+    # provider failed, don't pin the outage in the cache for the whole TTL.
+    if results:
+        listings_cache.set(cache_key, jobs)
+    return jobs
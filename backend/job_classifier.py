@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from assistant import get_response, extract_json, BATCH
+from cache import SqliteStore
+
+# Jobs per classification prompt, and characters of each description sent.
+BATCH_SIZE = 8
+MAX_DESCRIPTION_CHARS = 1500
+
+logger = logging.getLogger(__name__)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="job-classifier")
+_PAIR_RE = re.compile(r"(\d+)\D{0,20}?\b(yes|no|true|false)\b", re.IGNORECASE)
+
+
+def job_text(job):
+    if job.get('description'):
+        return job['description']
+    return '\n'.join(
+        info['title'] + ': ' + '\n'.join(info['items'])
+        for info in job.get('job_highlights', []) if 'items' in info
+    )
+
+
+def job_fingerprint(job):
+    """Content hash of a posting, so the same job from any provider or search shares verdicts."""
+    raw = '\x00'.join([job.get('title', ''), job.get('company_name', ''), job_text(job)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def verdict_key(fingerprint, disability):
+    return f"{disability}\x00{fingerprint}"
+
+
+# Feasibility verdicts per (job fingerprint, disability), in memory and on disk.
+verdict_cache = SqliteStore(os.getenv("JOB_VERDICT_CACHE_PATH", "job_verdicts.sqlite"), "feasibility",
+                            encode=int, decode=bool, maxsize=50000)
+
+
+def classification_prompt(jobs, disability):
+    listings = '\n\n'.join(
+        f"Job {idx}: {job.get('title', '')}\n{job_text(job)[:MAX_DESCRIPTION_CHARS]}"
+        for idx, job in enumerate(jobs)
+    )
+    return [{'role': 'user', 'content': f'Here is a person with disability {disability}. Below are {len(jobs)} job '
+                                        f'descriptions numbered from 0. For each job decide whether the person can '
+                                        f'perform it with a reasonable accommodation.\n\n{listings}\n\n'
+                                        f'Return only a JSON list with one object per job and no surrounding text, '
+                                        f'eg: [{{"index": 0, "feasible": true}}, {{"index": 1, "feasible": false}}]'}]
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'yes'):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ('false', 'no'):
+        return False
+    return None
+
+
+def parse_verdicts(text, count):
+    """
+    Map job index -> feasible from the model's answer.
+
+    Accepts the requested list of {"index", "feasible"} objects, a {"results": [...]}
+    wrapper, a list of booleans, or a plain list of feasible indexes, with or
+    without code fences or surrounding prose; an empty list means none are
+    feasible. Falls back to "<index> ... yes/no" pairs only when the answer has
+    no JSON that parses. Indexes the answer doesn't cover are left out.
+    """
+    data = extract_json(text)
+    verdicts = {}
+    if data is None:
+        for index, answer in _PAIR_RE.findall(text):
+            if int(index) < count:
+                verdicts[int(index)] = _as_bool(answer)
+        return verdicts
+    if isinstance(data, dict):
+        data = data.get('results')
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data):
+            for item in data:
+                index, feasible = item.get('index'), _as_bool(item.get('feasible'))
+                if isinstance(index, int) and 0 <= index < count and feasible is not None:
+                    verdicts[index] = feasible
+        elif data and all(isinstance(item, bool) for item in data) and len(data) == count:
+            verdicts = dict(enumerate(data))
+        elif all(isinstance(item, int) and not isinstance(item, bool) for item in data):
+            feasible = set(data)
+            verdicts = {index: index in feasible for index in range(count)}
+    return verdicts
+
+
+def classify_batch(jobs, disability, priority=BATCH):
+    return parse_verdicts(get_response(classification_prompt(jobs, disability), priority=priority), len(jobs))
+
+
+def classify_jobs(jobs, disability, priority=BATCH):
+    """
+    Whether the person can perform each job with a reasonable accommodation.
+
+    Verdicts are cached per (job fingerprint, disability), so each job is sent
+    to the model at most once per disability; uncached jobs go out in batches
+    of BATCH_SIZE, concurrently. A job the model gives no usable verdict for is
+    kept (treated as feasible) and not cached, so it is retried next time.
+    """
+    disability = str(disability).strip().lower()
+    fingerprints = [job_fingerprint(job) for job in jobs]
+    cache_keys = {fingerprint: verdict_key(fingerprint, disability) for fingerprint in fingerprints}
+    stored = verdict_cache.get_many(list(cache_keys.values()))
+    verdicts = {fingerprint: stored[key] for fingerprint, key in cache_keys.items() if key in stored}
+
+    pending = {}
+    for fingerprint, job in zip(fingerprints, jobs):
+        if fingerprint not in verdicts:
+            pending.setdefault(fingerprint, job)
+    if pending:
+        keys = list(pending)
+        batches = [keys[start:start + BATCH_SIZE] for start in range(0, len(keys), BATCH_SIZE)]
+        futures = [_executor.submit(classify_batch, [pending[key] for key in batch], disability, priority) for batch in batches]
+        fresh = {}
+        for batch, future in zip(batches, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning("Job classification failed: %s", e)
+                continue
+            for index, feasible in result.items():
+                fresh[batch[index]] = feasible
+        if fresh:
+            verdict_cache.set_many((cache_keys[fingerprint], feasible) for fingerprint, feasible in fresh.items())
+            verdicts.update(fresh)
+    return [verdicts.get(fingerprint, True) for fingerprint in fingerprints]
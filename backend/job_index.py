@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import numpy as np
+from ranking import BM25Index, fuse_scores, job_document
+
+logger = logging.getLogger(__name__)
+
+# Above this many rows queries go through a coarse clustered (IVF) index
+# instead of scoring every row.
+CLUSTER_THRESHOLD = 100_000
+
+
+def job_key(job):
+    """Stable identity for a listing: the provider job_id, else a hash of title/company/location."""
+    if job.get('job_id'):
+        return job['job_id']
+    raw = '|'.join(str(job.get(field, '')).strip().lower() for field in ('title', 'company_name', 'location'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indexes of the k highest scores, best first, without sorting the whole array."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class JobIndex:
+    """
+    Persistent corpus of job listings and their embeddings.
+
+    Embeddings are stored L2-normalized in one contiguous float32 matrix, so a
+    cosine top-k query is a single matrix-vector product. Listings are kept in
+    one ``index.npz`` under ``path`` (the vectors plus the listings as JSON),
+    so a save replaces both together, and read on first use.
+    """
+
+    def __init__(self, path, cluster_threshold=CLUSTER_THRESHOLD):
+        self.path = path
+        self.cluster_threshold = cluster_threshold
+        self.jobs = []
+        self.rows = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._centroids = None
+        self._lists = None
+        self._clustered_size = 0
+        self._bm25 = None
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def __len__(self):
+        self.ensure_loaded()
+        return self._size
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    @property
+    def matrix(self):
+        return self._matrix[:self._size]
+
+    def load(self):
+        index_path = os.path.join(self.path, 'index.npz')
+        with self._lock:
+            if os.path.exists(index_path):
+                try:
+                    with np.load(index_path, allow_pickle=False) as data:
+                        jobs = json.loads(data['jobs'].tobytes().decode('utf-8'))
+                        matrix = np.ascontiguousarray(data['embeddings'], dtype=np.float32)
+                    if len(jobs) != len(matrix):
+                        raise ValueError(f"{len(jobs)} listings but {len(matrix)} embedding rows")
+                except Exception as e:
+                    # Start empty; the next refresh rebuilds the corpus and overwrites the file.
+                    logger.warning("Ignoring unreadable job index %s: %s", index_path, e)
+                else:
+                    self.jobs = jobs
+                    self._matrix = matrix
+                    self._size = len(jobs)
+                    self.rows = {job_key(job): row for row, job in enumerate(jobs)}
+                    self._centroids = None
+                    self._bm25 = None
+                    self._maybe_cluster()
+            self._loaded = True
+
+    def save(self):
+        self.ensure_loaded()
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            jobs = np.frombuffer(json.dumps(self.jobs).encode('utf-8'), dtype=np.uint8)
+            # A unique temp name per writer, and one file swapped in with a single
+            # atomic rename, so neither a crash nor a concurrent save (another
+            # worker) can leave listings and vectors out of step.
+            fd, tmp_path = tempfile.mkstemp(prefix='index.', suffix='.tmp', dir=self.path)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, jobs=jobs, embeddings=self.matrix)
+                os.replace(tmp_path, os.path.join(self.path, 'index.npz'))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def add(self, jobs, embeddings):
+        """
+        Insert or replace listings, keyed by job_key, with their embedding rows.
+        Returns the keys of listings that are new or whose content changed.
+        """
+        if not jobs:
+            return []
+        self.ensure_loaded()
+        vectors = normalize_rows(embeddings)
+        changed = []
+        with self._lock:
+            if self._size == 0:
+                self._matrix = np.zeros((max(len(jobs), 1024), vectors.shape[1]), dtype=np.float32)
+            for job, vector in zip(jobs, vectors):
+                key = job_key(job)
+                row = self.rows.get(key)
+                if row is None:
+                    row = self._size
+                    self._grow(row + 1)
+                    self.jobs.append(job)
+                    self.rows[key] = row
+                    self._size += 1
+                    changed.append(key)
+                    if self._centroids is not None:
+                        self._assign(row, vector)
+                    if self._bm25 is not None:
+                        self._bm25.add(job_document(job))
+                else:
+                    if job != self.jobs[row] or not np.array_equal(vector, self._matrix[row]):
+                        changed.append(key)
+                    if self._bm25 is not None and job_document(job) != job_document(self.jobs[row]):
+                        # Postings can't be edited in place; rebuild on the next lexical query.
+                        self._bm25 = None
+                    self.jobs[row] = job
+                self._matrix[row] = vector
+            self._maybe_cluster()
+        return changed
+
+    def get(self, key):
+        self.ensure_loaded()
+        row = self.rows.get(key)
+        return None if row is None else self.jobs[row]
+
+    def score_listings(self, keys, queries, query_texts):
+        """
+        Raw cosine similarity and BM25 score of the listings ``keys`` (unknown
+        keys are skipped) against each query, as two (queries x listings) arrays.
+        Only those listings' rows are touched, not the whole corpus.
+        """
+        self.ensure_loaded()
+        queries = normalize_rows(queries)
+        with self._lock:
+            rows = [self.rows[key] for key in keys if key in self.rows]
+            if not rows:
+                empty = np.zeros((len(queries), 0), dtype=np.float32)
+                return empty, empty
+            cosine = queries @ self._matrix[rows].T
+            bm25 = self._bm25_index()
+            lexical = np.stack([bm25.scores(text)[rows] for text in query_texts])
+            return cosine, lexical
+
+    def search(self, query, k=10, query_text=None):
+        """
+        Return the k best listings for the ``query`` embedding as (job, score) pairs.
+
+        Scores are cosine similarity, or with ``query_text`` the fusion of cosine
+        similarity and BM25 over the listings' text.
+        """
+        self.ensure_loaded()
+        query = normalize_rows(query)
+        with self._lock:
+            if self._size == 0:
+                return []
+            if self._centroids is None:
+                candidates = None
+                scores = self.matrix @ query
+            else:
+                candidates = self._probe(query)
+                scores = self._matrix[candidates] @ query
+            if query_text:
+                lexical = self._bm25_index().scores(query_text)
+                scores = fuse_scores(scores, lexical if candidates is None else lexical[candidates])
+            best = top_k(scores, k)
+            rows = best if candidates is None else candidates[best]
+            return [(self.jobs[row], float(scores[i])) for row, i in zip(rows, best)]
+
+    def _bm25_index(self):
+        if self._bm25 is None:
+            self._bm25 = BM25Index()
+            for job in self.jobs:
+                self._bm25.add(job_document(job))
+        return self._bm25
+
+    def _grow(self, size):
+        if size <= len(self._matrix):
+            return
+        grown = np.zeros((max(size, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+        grown[:self._size] = self.matrix
+        self._matrix = grown
+
+    def _maybe_cluster(self):
+        # Rebuild the coarse index when the corpus first crosses the threshold
+        # and again each time it doubles, so the centroids track the data.
+        if self._size < self.cluster_threshold:
+            self._centroids = None
+            return
+        if self._centroids is None or self._size >= 2 * self._clustered_size:
+            self._build_clusters()
+
+    def _build_clusters(self, iterations=10, seed=0):
+        """Spherical k-means over a sample of rows, then assign every row to its nearest centroid."""
+        rng = np.random.default_rng(seed)
+        nlist = int(np.sqrt(self._size))
+        sample = self.matrix[rng.choice(self._size, size=min(self._size, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        assignment = np.empty(self._size, dtype=np.int64)
+        for start in range(0, self._size, 65536):
+            block = self.matrix[start:start + 65536]
+            assignment[start:start + 65536] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        self._centroids = centroids
+        self._lists = [list(order[bounds[i]:bounds[i + 1]]) for i in range(nlist)]
+        self._clustered_size = self._size
+
+    def _assign(self, row, vector):
+        self._lists[int(np.argmax(self._centroids @ vector))].append(row)
+
+    def _probe(self, query, nprobe=8):
+        nearest = top_k(self._centroids @ query, nprobe)
+        return np.concatenate([np.asarray(self._lists[i], dtype=np.int64) for i in nearest])
+
+
+job_index = JobIndex(os.getenv("JOB_INDEX_DIR", "job_index"))
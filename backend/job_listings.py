@@ -4,8 +4,15 @@ import requests
 load_dotenv()
 import os
 
+# SerpAPI reports an empty result set as an error; that one is a real answer.
+_NO_RESULTS = "hasn't returned any results"
 
-def get_google_listings(job_title, location):
+
+class JobProviderError(Exception):
+    """A job provider answered with an error rather than listings."""
+
+
+def get_google_listings(job_title, location, timeout=10):
     params = {
       "engine": "google_jobs",
       "q": job_title,
@@ -14,12 +21,17 @@ def get_google_listings(job_title, location):
       "api_key": os.getenv("GOOGLE_JOBS_KEY")
     }
     search = GoogleSearch(params)
+    # The client's default timeout is 60000 seconds.
+    search.timeout = timeout
     results = search.get_dict()
-    jobs_results = results["jobs_results"]
+    error = results.get("error")
+    if error and _NO_RESULTS not in error:
+        raise JobProviderError(f"SerpAPI: {error}")
+    jobs_results = results.get("jobs_results", [])
     return jobs_results
 
 
-def get_adzuna_listings(job_title, location):
+def get_adzuna_listings(job_title, location, timeout=10):
       COUNTRY_CODE = "us"
       base_url = f"https://api.adzuna.com/v1/api/jobs/{COUNTRY_CODE}/search/1"
       params = {
@@ -31,17 +43,24 @@ def get_adzuna_listings(job_title, location):
         "max_days_old": 15,
         "part_time": 1
       }
-      try:
-          response = requests.get(base_url, params=params)
-          response.raise_for_status()
-          data = response.json()
-
-          return data.get("results", [])
-
-      except requests.exceptions.RequestException as e:
-          print(f"Error: {e}")
-          return []
-
+      # Errors propagate: an outage must not look like a search with no results.
+      response = requests.get(base_url, params=params, timeout=timeout)
+      response.raise_for_status()
+      data = response.json()
 
+      return data.get("results", [])
 
 
+def adzuna_to_listing(result):
+    """Reshape an Adzuna result into the SerpAPI google_jobs listing format used downstream."""
+    description = result.get("description", "")
+    return {
+        "job_id": f"adzuna:{result.get('id')}",
+        "title": result.get("title", ""),
+        "company_name": result.get("company", {}).get("display_name", ""),
+        "location": result.get("location", {}).get("display_name", ""),
+        "via": "Adzuna",
+        "description": description,
+        "job_highlights": [{"title": "Description", "items": [description]}],
+        "apply_options": [{"title": "Adzuna", "link": result.get("redirect_url")}],
+    }
@@ -1,18 +1,46 @@
-from fastapi import FastAPI, Body
-import ast
-from resume_creator import create_resume
+from fastapi import FastAPI, Body, Query
+from resume_creator import render_resume_async, shutdown_render_pool, DOCX_MEDIA_TYPE
 from pydantic import BaseModel
-from utils import generate_session_id, process_jobs
-from assistant import get_response
-from cosmos_db import upsert_conversation, upsert_profile, user_profile
-from db import conn
+from utils import generate_session_id, process_session, get_desc_str, refresh_job_index
+from recommendations import get_recommendations, recommendation_refresher
+from job_index import job_index
+from models import ChatSession
+from session_store import session_manager
+from chat_context import build_context, compact_context
+from tailoring import tailor_profile
+from mood_analysis import mood_queue
+from assistant import (get_response, get_response_async, stream_response, close_async_client, get_client,
+                       get_async_client, get_embeddings_client, INTERACTIVE)
+from cosmos_db import (conversation_writer, upsert_profile, get_profile, get_profiles_container,
+                       get_conversations_container, profile_changes)
+from db import execute, fetchall_async, ping
+from metrics import render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, http_request_seconds
+from emotions import (emotion_query, encode_cursor, decode_cursor, row_to_dict, daily_query, trigger_query,
+                      LATEST_QUERY)
 from typing import Optional, List
 from fastapi import HTTPException, status
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import asyncio
 import json
+import logging
+import os
+import re
+import time
+import zipfile
+from io import BytesIO
 from contextlib import closing
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+
+# LOG_LEVEL=DEBUG also logs every prompt sent to the model.
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+# Client libraries log every HTTP request at INFO.
+for name in ("httpx", "azure"):
+    logging.getLogger(name).setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -25,7 +53,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not the raw path, so ids don't explode the series count.
+    route = request.scope.get("route")
+    http_request_seconds.observe(time.perf_counter() - start, method=request.method,
+                                 route=route.path if route else "unmatched", status=response.status_code)
+    return response
+
+
 class EmotionData(BaseModel):
+    id: Optional[int] = None
     user_id: int
     reason: str
     emotion: str
@@ -35,34 +75,15 @@ class EmotionResponse(BaseModel):
     status: str
     data: List[EmotionData]
     message: Optional[str] = None
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
 
 class ChatMessage(BaseModel):
     message: str
     session_id: Optional[str] = None  # Frontend sends this after first message
 
-class ChatSession(BaseModel):
-    session_id: str
-    role: str
-    is_active: bool = True
-    created_at: datetime = datetime.now()
-    last_activity: datetime = datetime.now()
-    messages: list = [{"role": "system", "content": f"""You are an empathetic and supportive assistant engaging in 
-             natural conversation. Your primary goal is to provide a comforting and
-             uplifting interaction while subtly gathering insights into his emotional state after work.
-             Approach:
-
-            Ease into conversations organically, discussing his work, interests, or routine to make him feel comfortable.
-            Offer encouragement and validation, creating a safe space for him to express himself naturally.
-            Pay close attention to his tone, word choices, and responses to infer his emotional state.
-            Identify any specific events or interactions that may have influenced his mood without directly asking about his 
-            feelings.
-            Use your understanding to respond with empathy and, when appropriate, cheer him up with positive reinforcement,
-            ensuring he feels heard and supported while 
-            allowing his emotions to surface naturally. 
-            Don't ask too many questions if you feel like the responses are not engaging.
-            """},
-                {"role": "assistant", "content": "Hey buddy, How are you today ?"}
-                ]
+class BatchTailorRequest(BaseModel):
+    job_descriptions: List[str] = []
+    job_ids: List[str] = []  # job_id values from /recommended_jobs
 
 
 class User(BaseModel):
@@ -72,65 +93,224 @@ class User(BaseModel):
     WorkHistory: str
 
 
-sessions: dict[str, ChatSession] = {}
+# Searches kept warm in the local job corpus; recommendations are served from it.
+JOB_SEARCHES = [('Waiter', 'Atlanta, GA')]
+JOB_REFRESH_SECONDS = 60 * 60
+# How often the profiles change feed is polled for writes made by other instances.
+PROFILE_FEED_SECONDS = 10
+SESSION_SWEEP_SECONDS = 5
+# Concurrent tailoring completions per batch request, and jobs allowed per batch.
+TAILOR_CONCURRENCY = 5
+MAX_BATCH_JOBS = 50
+# Rows per query when streaming /emotions as NDJSON. Each page is a separate
+# query, so a slow reader doesn't hold a pooled SQL connection between pages.
+STREAM_PAGE_ROWS = 500
+
+
+def init_openai():
+    get_client()
+    get_async_client()
+    get_embeddings_client()
+
+
+def init_cosmos():
+    get_profiles_container()
+    get_conversations_container()
+
+
+# Backends are initialized lazily; these bring each one up (or check it) for /ready.
+READINESS_CHECKS = {
+    "openai": init_openai,
+    "cosmos": init_cosmos,
+    "sql": ping,
+    "job_index": job_index.ensure_loaded,
+}
+READINESS_TIMEOUT = 10
+
+
+async def run_readiness_checks():
+    async def check(func):
+        try:
+            await asyncio.wait_for(asyncio.to_thread(func), READINESS_TIMEOUT)
+            return "ok"
+        except Exception as e:
+            return f"error: {e!r}"
+    results = await asyncio.gather(*(check(func) for func in READINESS_CHECKS.values()))
+    return dict(zip(READINESS_CHECKS, results))
+
+
+@app.on_event("startup")
+async def warm_up():
+    # Connect in the background so startup doesn't wait on any network handshake.
+    asyncio.create_task(run_readiness_checks())
+
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: every backend client is initialized and reachable."""
+    checks = await run_readiness_checks()
+    ok = all(result == "ok" for result in checks.values())
+    return JSONResponse(status_code=200 if ok else 503, content={"status": "ready" if ok else "unavailable", "checks": checks})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.on_event("startup")
 async def start_session_cleanup():
+    mood_queue.start()
     asyncio.create_task(session_cleanup())
 
 
+@app.on_event("startup")
+async def start_job_refresh():
+    asyncio.create_task(job_refresh())
+
+
+async def job_refresh():
+    while True:
+        for job_title, location in JOB_SEARCHES:
+            try:
+                changed = await asyncio.to_thread(refresh_job_index, job_title, location)
+                logger.info("Indexed %d new or changed listings for %s in %s", len(changed), job_title, location)
+                recommendation_refresher.jobs_changed(changed)
+            except Exception:
+                logger.exception("Job refresh failed for %s in %s", job_title, location)
+        await asyncio.sleep(JOB_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+async def start_profile_feed():
+    asyncio.create_task(watch_profiles())
+
+
+async def watch_profiles():
+    continuation = None
+    while True:
+        try:
+            profiles, token = await asyncio.to_thread(profile_changes, continuation)
+            continuation = token or continuation
+            for profile in profiles:
+                recommendation_refresher.profile_changed(profile)
+        except Exception:
+            logger.exception("Polling the profile change feed failed")
+        await asyncio.sleep(PROFILE_FEED_SECONDS)
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    await mood_queue.close()
+    await close_async_client()
+    await asyncio.to_thread(conversation_writer.close)
+    await asyncio.to_thread(recommendation_refresher.close)
+    await asyncio.to_thread(shutdown_render_pool)
+
+
 async def session_cleanup():
     while True:
-        for session in list(sessions.values()):
-            if (datetime.now() - session.last_activity).total_seconds() > 1 * 60 and session.is_active:
-                session.is_active = False
-                ct = ChatMessage(session_id=session.session_id, message='end')
+        try:
+            # Only sessions whose deadline has passed are touched, however many are live.
+            expired = await session_manager.pop_expired()
+        except Exception:
+            # e.g. the session file stayed locked past its busy timeout; retry next sweep.
+            logger.exception("Session sweep failed")
+            expired = []
+        for session in expired:
+            logger.info("Session %s ended due to inactivity", session.session_id)
+            try:
+                # Mood analysis and the eMOTION write happen in the background, in batches.
+                await persist_session(session)
+                await mood_queue.submit(session.user_id, session)
+            except Exception:
+                logger.exception("Failed to end session %s", session.session_id)
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+
+
+async def persist_session(session: ChatSession):
+    """Hand a snapshot of the conversation to the write-behind buffer."""
+    snapshot = process_session(session)
+    if not conversation_writer.offer(snapshot):
+        # Buffer full: wait for room in a thread so the event loop keeps serving.
+        await asyncio.to_thread(conversation_writer.put, snapshot)
+
+
+async def get_session(id, message: ChatMessage):
+    """Return the session named by the message, starting a new one on the first message."""
+    if not message.session_id:
+        session_id = generate_session_id()
+        new_session = ChatSession(session_id=session_id, role="employee", user_id=id)
+        await session_manager.save(new_session)
+        return new_session
+    session = await session_manager.get(message.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+async def start_turn(session: ChatSession, profile, text):
+    if not session.profile_note:
+        session.profile_note = f"{profile['name']} is a {profile['current_occupation']} with {profile['disability']}"
+    session.last_activity = datetime.now()
+    session.add_message("user", text)
+    # Push the deadline out now so the sweeper can't expire the session mid-turn.
+    await session_manager.save(session)
 
-                print(f"Session {session.session_id} ended due to inactivity.")
-                await handle_employee_chat('2', ct)
-        await asyncio.sleep(60)
+
+# Background compactions in flight, by session id; at most one per session.
+_compactions = {}
+
+
+async def compact_session(session):
+    """Fold old turns into the session summary, applying it to the stored copy."""
+    base = session.summarized_upto
+    try:
+        update = await compact_context(session)
+        if update is None:
+            return
+        # With the SQLite backend the stored session may be newer than this copy.
+        # Apply the summary to it, unless another worker already folded these turns.
+        current = await session_manager.get(session.session_id)
+        if current is None or current.summarized_upto != base:
+            return
+        current.summary, current.summarized_upto = update
+        await session_manager.save(current)
+    except Exception:
+        logger.exception("Failed to compact session %s", session.session_id)
+
+
+def schedule_compaction(session):
+    """
+    Compact the context in the background once the reply has gone out, so the
+    summarization call never delays a response; build_context keeps requests
+    within the token budget in the meantime.
+    """
+    if session.session_id in _compactions:
+        return
+    task = asyncio.create_task(compact_session(session))
+    _compactions[session.session_id] = task
+    task.add_done_callback(lambda _: _compactions.pop(session.session_id, None))
 
 
 @app.post("/employee-chat/{id}")
 async def handle_employee_chat(id, message: ChatMessage):
     """Endpoint for employee conversations"""
-    profile = user_profile.read_item(id, partition_key=id)
-    if not message.session_id:
-        session_id = generate_session_id()
-        new_session = ChatSession(session_id=session_id, role="employee")
-        sessions[session_id] = new_session
-        session = new_session
-    else:
-        session = sessions.get(message.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        if sessions.get(message.session_id) and not session.is_active:
-            session.messages.append({'role': 'user', 'content': """ If the question: Please analyse the above conversation, 
-            pick a mood from ['neutral', 'excited', 'anxious', 'frustrated', 'depressed']
-            you return two things in JSON format like this 
-        {   "mood": , "reason": <relevant reason from conversation>"""})
-            response = get_response(session.messages)
-            response = json.loads(response)
-            sessions.clear()
-            cursor = conn.cursor()
-            cursor.execute("""
-        INSERT INTO eMOTION (user_id, reason, emotion)
-        VALUES (?, ?, ?)
-    """, (int(id), response['reason'], response['mood']))
-            conn.commit()
-            print('inserted')
-            return {
-                "end": True,
-                "status": "success",
-                "message": "Received employee message",
-                "response": response
-            }
-    session.messages[0]['content'] += f"{profile['name']} is a {profile['current_occupation']} with {profile['disability']}"
-    session.last_activity = datetime.now()
-    session.messages.append({"role": "user", "content": message.message})
-    response = get_response(session.messages)
-    session.messages.append({"role": "assistant", "content": response})
+    profile = await asyncio.to_thread(get_profile, id)
+    session = await get_session(id, message)
+    await start_turn(session, profile, message.message)
+    response = await get_response_async(build_context(session))
+    session.add_message("assistant", response)
+    await session_manager.save(session)
+    schedule_compaction(session)
+    await persist_session(session)
     return {
         "end": False,
         "status": "success",
@@ -140,20 +320,57 @@ async def handle_employee_chat(id, message: ChatMessage):
     }
 
 
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/employee-chat/{id}/stream")
+async def stream_employee_chat(id, message: ChatMessage):
+    """
+    Streaming variant of /employee-chat. Replies are sent as server-sent events:
+    a ``session`` event with the session id, one ``data`` event per token and a
+    final ``done`` event.
+    """
+    profile = await asyncio.to_thread(get_profile, id)
+    session = await get_session(id, message)
+    await start_turn(session, profile, message.message)
+    context = build_context(session)
+
+    async def events():
+        yield sse_event({"session_id": session.session_id}, event="session")
+        tokens = []
+        try:
+            async for token in stream_response(context):
+                tokens.append(token)
+                yield sse_event({"token": token})
+            yield sse_event({"response": "".join(tokens).strip()}, event="done")
+        finally:
+            # Record the turn even if the client disconnects mid-stream.
+            if tokens:
+                session.add_message("assistant", "".join(tokens).strip())
+            await session_manager.save(session)
+            schedule_compaction(session)
+            await persist_session(session)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post('/login', status_code=status.HTTP_201_CREATED)
 def create_user(user: User):
     prompt = [{'role': 'user', "content": f"summarise the below skills and work experience of an employee. "
                                            f"Here are the skill: {user.Skills} \n Here is the work experience: "
                                            f"{user.WorkHistory}"}]
 
-    summary = get_response(prompt)
-    cursor = conn.cursor()
-    cursor.execute("""
+    summary = get_response(prompt, cache=True, priority=INTERACTIVE)
+    execute("""
         INSERT INTO Employees (Name, Role, Skills, summary, work_history)
         VALUES (?, ?, ?, ?, ?)
     """, (user.Name, user.Role, user.Skills, summary, user.WorkHistory))
-    conn.commit()
-    conn.commit()
     return {"data": user}
 
 
@@ -161,70 +378,181 @@ def create_user(user: User):
 def create_profile(id, profile: dict = Body(...)):
     prompt = [{'role': 'user', "content": f"Provide a two to three line summary based on the below details for a resume."
                                           f"{profile['skills']} \n {profile['work_experience']} \n {profile['summary']}"}]
-    summary = get_response(prompt)
+    summary = get_response(prompt, cache=True, priority=INTERACTIVE)
     profile['summary'] = summary
     profile['id'] = id
-    upsert_profile(profile)
+    recommendation_refresher.profile_changed(upsert_profile(profile))
     return {"status": 'success'}
 
 
 @app.post('/suggest_edits/{id}')
-def suggest_edits(jd, id):
-    profile = user_profile.read_item(id, partition_key=id)
-    prompt = [{'role': 'user', "content":
-               f"Here's a Job description : {jd} "
-               f"Here's a user profile in json format:  "
-               f"{profile['skills']} \n {profile['work_experience']} \n {profile['summary']}"
-               f"Your job is tailor the resume according to the Job description. make sure it is curated not very generic."
-               f"you will return skills, work experience points and summary in the following format"
-               f"[summary]*[skill1, skill2, skill3]*[[job1 point 1, job1 point 2], [job2 point1, job2 point2]]"}]
-
-    response = get_response(prompt)
-    summary, skills, jobs = response.split('*')
-    profile['skills'] = ast.literal_eval(skills)
-    profile['summary'] = summary[0]
-    for idx, job in enumerate(profile['work_experience']):
-        job['summary'] = jobs[idx]
-
-    create_resume(profile)
-    return {'status': 'success'}
+async def suggest_edits(jd, id):
+    # get_profile may revalidate against Cosmos; keep that off the event loop.
+    profile = await tailor_profile(await asyncio.to_thread(get_profile, id), jd)
+    resume = await render_resume_async(profile)
+    return StreamingResponse(
+        BytesIO(resume),
+        media_type=DOCX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="resume_{id}.docx"'}
+    )
+
+
+@app.post('/suggest_edits/{id}/batch')
+async def suggest_edits_batch(id, request: BatchTailorRequest):
+    """
+    Tailor the profile to many jobs at once and return the resumes as one zip.
+
+    Jobs are given as raw descriptions and/or job_ids from /recommended_jobs.
+    Tailoring prompts run concurrently, at most TAILOR_CONCURRENCY at a time,
+    and renders run in parallel in the resume process pool. Jobs that fail are
+    listed in errors.json inside the zip.
+    """
+    jobs = [(f"job_{idx + 1}", jd) for idx, jd in enumerate(request.job_descriptions)]
+    missing = []
+    for job_id in request.job_ids:
+        job = job_index.get(job_id)
+        if job is None:
+            missing.append(job_id)
+        else:
+            jobs.append((job.get('title') or job_id, job.get('description') or get_desc_str(job.get('job_highlights', []))))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown job ids: {missing}")
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No job descriptions given")
+    if len(jobs) > MAX_BATCH_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_JOBS} jobs per batch")
+
+    profile = await asyncio.to_thread(get_profile, id)
+    limit = asyncio.Semaphore(TAILOR_CONCURRENCY)
+
+    async def build(jd):
+        async with limit:
+            tailored = await tailor_profile(profile, jd)
+        return await render_resume_async(tailored)
+
+    results = await asyncio.gather(*(build(jd) for _, jd in jobs), return_exceptions=True)
+    if all(isinstance(result, Exception) for result in results):
+        raise HTTPException(status_code=502, detail=f"Tailoring failed: {results[0]}")
+
+    buffer = BytesIO()
+    errors = {}
+    # .docx files are already deflated, so store them as-is.
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for idx, ((name, _), result) in enumerate(zip(jobs, results)):
+            if isinstance(result, Exception):
+                errors[name] = str(result)
+                continue
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')[:60] or 'job'
+            archive.writestr(f"resume_{idx + 1}_{slug}.docx", result)
+        if errors:
+            archive.writestr("errors.json", json.dumps(errors, indent=2))
+    buffer.seek(0)
+    return StreamingResponse(
+        buffer,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="resumes_{id}.zip"'}
+    )
 
 
 @app.get('/recommended_jobs/{id}')
 def get_relevant_jobs(id):
-    profile = user_profile.read_item(id, partition_key=id)
-    summary = profile['summary']
+    profile = get_profile(id)
     # disability = profile['disability']
-    results = process_jobs(summary, 'Waiter', 'Atlanta, GA', 'autism')
-    return {'data': results}
+    return {'data': get_recommendations(profile, 'Waiter', 'Atlanta, GA', 'autism')}
+
+async def stream_emotions(user_id, start, end, after, limit):
+    """NDJSON lines for the matching rows, fetched in keyset pages of STREAM_PAGE_ROWS."""
+    sent = 0
+    while limit is None or sent < limit:
+        size = STREAM_PAGE_ROWS if limit is None else min(STREAM_PAGE_ROWS, limit - sent)
+        rows = await fetchall_async(*emotion_query(user_id, start, end, after, size))
+        if rows:
+            yield "".join(json.dumps(row_to_dict(row)) + "\n" for row in rows)
+        sent += len(rows)
+        if len(rows) < size:
+            return
+        after = (rows[-1][4], rows[-1][0])
+
 
 @app.get("/emotions", response_model=EmotionResponse)
-async def get_emotions():
+async def get_emotions(
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Emotion records, newest first, optionally for one user and a [start, end) date range.
+
+    With ``limit`` or ``cursor``, JSON responses are pages of ``limit`` rows
+    (500 by default) with a ``next_cursor`` for the following page; with
+    neither, every matching row is returned at once. ``format=ndjson`` streams
+    every matching row (or the first ``limit``) one JSON object per line.
+    """
     try:
-        # Using context manager to ensure that only the cursor is closed after the operation
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT user_id, reason, emotion, created_date FROM eMOTION;")
-            rows = cursor.fetchall()
-
-            # Convert rows to list of EmotionData objects including created_date
-            emotions = [
-                EmotionData(
-                    user_id=row[0],    
-                    reason=row[1],     
-                    emotion=row[2],    
-                    created_date=row[3]  
-                )
-                for row in rows
-            ]
-            
-            return EmotionResponse(
-                status="success",
-                data=emotions,
-                message="Emotions retrieved successfully"
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        return StreamingResponse(stream_emotions(user_id, start, end, after, limit),
+                                 media_type="application/x-ndjson")
+
+    paged = limit is not None or cursor is not None
+    limit = limit or 500
+    try:
+        # One extra row tells us whether another page exists.
+        sql, params = emotion_query(user_id, start, end, after, limit + 1 if paged else None)
+        rows = await fetchall_async(sql, params)
+
+        # Convert rows to list of EmotionData objects including created_date
+        emotions = [
+            EmotionData(
+                id=row[0],
+                user_id=row[1],    
+                reason=row[2],     
+                emotion=row[3],    
+                created_date=row[4]  
             )
-        finally:
-            cursor.close()  # Only close the cursor, not the connection
+            for row in (rows[:limit] if paged else rows)
+        ]
+        next_cursor = None
+        if paged and len(rows) > limit:
+            next_cursor = encode_cursor(rows[limit - 1][4], rows[limit - 1][0])
+        
+        return EmotionResponse(
+            status="success",
+            data=emotions,
+            message="Emotions retrieved successfully",
+            next_cursor=next_cursor
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@app.get("/emotions/daily")
+async def get_daily_emotions(user_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """Per user, day and mood record counts from the EmotionDaily rollup."""
+    rows = await fetchall_async(*daily_query(user_id, start, end))
+    return {"status": "success",
+            "data": [{"user_id": row[0], "day": row[1], "mood": row[2], "entries": row[3]} for row in rows]}
+
+
+@app.get("/emotions/triggers")
+async def get_emotion_triggers(user_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """Record counts per trigger and mood over the range, for the trigger heatmap."""
+    rows = await fetchall_async(*trigger_query(user_id, start, end))
+    return {"status": "success",
+            "data": [{"trigger": row[0], "mood": row[1], "entries": row[2]} for row in rows]}
+
+
+@app.get("/emotions/latest")
+async def get_latest_emotions():
+    """Most recent mood of every employee."""
+    rows = await fetchall_async(LATEST_QUERY)
+    return {"status": "success",
+            "data": [{"user_id": row[0], "mood": row[1], "reason": row[2], "trigger": row[3], "created_date": row[4]}
+                     for row in rows]}
@@ -0,0 +1,113 @@
+import json
+import sys
+from datetime import datetime
+
+# One copy of the system prompt per process; sessions refer to it rather than
+# storing it, and profile notes and summaries are appended only when a request
+# is built (see chat_context.system_message).
+SYSTEM_PROMPT = sys.intern("""You are an empathetic and supportive assistant engaging in 
+             natural conversation. Your primary goal is to provide a comforting and
+             uplifting interaction while subtly gathering insights into his emotional state after work.
+             Approach:
+
+            Ease into conversations organically, discussing his work, interests, or routine to make him feel comfortable.
+            Offer encouragement and validation, creating a safe space for him to express himself naturally.
+            Pay close attention to his tone, word choices, and responses to infer his emotional state.
+            Identify any specific events or interactions that may have influenced his mood without directly asking about his 
+            feelings.
+            Use your understanding to respond with empathy and, when appropriate, cheer him up with positive reinforcement,
+            ensuring he feels heard and supported while 
+            allowing his emotions to surface naturally. 
+            Don't ask too many questions if you feel like the responses are not engaging.
+            """)
+GREETING = "Hey buddy, How are you today ?"
+
+_ROLES = {role: sys.intern(role) for role in ('system', 'user', 'assistant')}
+
+
+class Message:
+    """
+    One chat turn. Slots keep it to two references, and roles are interned, so
+    a turn costs little beyond its text. Treat as immutable: the opening
+    greeting is a single instance shared by every session.
+    """
+
+    __slots__ = ('role', 'content')
+
+    def __init__(self, role, content):
+        self.role = _ROLES.get(role) or sys.intern(role)
+        self.content = content
+
+    def __getitem__(self, key):
+        # turn['role'] / turn['content'], as with the message dicts the API takes.
+        if key not in Message.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content!r})"
+
+    def as_dict(self):
+        return {'role': self.role, 'content': self.content}
+
+
+SYSTEM_MESSAGE = {'role': 'system', 'content': SYSTEM_PROMPT}
+GREETING_MESSAGE = Message('assistant', GREETING)
+
+
+class ChatSession:
+    """
+    A live conversation.
+
+    ``messages`` holds the turns after the system prompt, starting with the
+    greeting. The system prompt itself is shared and added when a request or
+    snapshot is built.
+    """
+
+    __slots__ = ('session_id', 'role', 'user_id', 'created_at', 'last_activity', 'profile_note',
+                 'summary', 'summarized_upto', 'messages')
+
+    def __init__(self, session_id, role, user_id=None, created_at=None, last_activity=None,
+                 profile_note='', summary='', summarized_upto=0, messages=None):
+        self.session_id = session_id
+        self.role = role
+        self.user_id = user_id
+        self.created_at = created_at or datetime.now()
+        self.last_activity = last_activity or datetime.now()
+        # Added to the system prompt once, when the first turn is taken.
+        self.profile_note = profile_note
+        # Running summary of messages[:summarized_upto]; later messages are kept verbatim.
+        self.summary = summary
+        self.summarized_upto = summarized_upto
+        self.messages = [GREETING_MESSAGE] if messages is None else messages
+
+    def add_message(self, role, content):
+        self.messages.append(Message(role, content))
+
+    def to_json(self):
+        return json.dumps({
+            'session_id': self.session_id,
+            'role': self.role,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat(),
+            'last_activity': self.last_activity.isoformat(),
+            'profile_note': self.profile_note,
+            'summary': self.summary,
+            'summarized_upto': self.summarized_upto,
+            # Compact [role, content] pairs rather than dicts.
+            'messages': [[turn.role, turn.content] for turn in self.messages],
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        data = json.loads(data)
+        # Snapshots written before sessions dropped is_active still carry it.
+        data.pop('is_active', None)
+        messages = [GREETING_MESSAGE if role == 'assistant' and content == GREETING else Message(role, content)
+                    for role, content in data.pop('messages')]
+        return cls(
+            created_at=datetime.fromisoformat(data.pop('created_at')),
+            last_activity=datetime.fromisoformat(data.pop('last_activity')),
+            messages=messages,
+            **data
+        )
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from assistant import get_response_async, extract_json, BACKGROUND
+from db import execute_async
+from emotions import TRIGGERS, record_emotions_batch, normalize_trigger
+
+MOODS = ['neutral', 'excited', 'anxious', 'frustrated', 'depressed']
+# Conversations per analysis prompt, and how long a worker waits for a batch to fill.
+BATCH_SIZE = 5
+BATCH_LINGER = 0.5
+MOOD_WORKERS = int(os.getenv("MOOD_WORKERS", "2"))
+MAX_ATTEMPTS = 4
+# Retry n waits about BACKOFF_BASE * 2**n seconds (capped, with +/-50% jitter).
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+# Characters of each conversation sent, taken from its end.
+MAX_TRANSCRIPT_CHARS = 4000
+
+logger = logging.getLogger(__name__)
+
+
+def transcript(session):
+    """The conversation as text: the running summary, then the turns it doesn't cover."""
+    lines = [f"user: {turn['content']}" if turn['role'] == 'user' else f"assistant: {turn['content']}"
+             for turn in session.messages[session.summarized_upto:]]
+    text = '\n'.join(lines)[-MAX_TRANSCRIPT_CHARS:]
+    if session.summary:
+        text = f"Summary of earlier messages: {session.summary}\n{text}"
+    return text
+
+
+def mood_prompt(transcripts):
+    conversations = '\n\n'.join(f"Conversation {idx}:\n{text}" for idx, text in enumerate(transcripts))
+    return [{'role': 'user', 'content': f"Below are {len(transcripts)} conversations numbered from 0. For each one, "
+                                        f"pick a mood from {MOODS} and the main trigger for it from {TRIGGERS}, "
+                                        f"with a short reason taken from the conversation.\n\n{conversations}\n\n"
+                                        f"Return only a JSON list with one object per conversation, eg: "
+                                        f'[{{"index": 0, "mood": "neutral", "reason": "...", "trigger": "workload"}}]'}]
+
+
+def parse_moods(text, count):
+    """
+    Map conversation index -> (mood, reason, trigger) from the model's answer.
+
+    Accepts the requested list, or a single object when there is one
+    conversation, with or without code fences. Entries with an unknown mood
+    are left out, so the caller can retry them.
+    """
+    data = extract_json(text)
+    if isinstance(data, dict):
+        data = [dict(data, index=data.get('index', 0))] if count == 1 else data.get('results')
+    results = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index, mood = item.get('index'), str(item.get('mood') or '').strip().lower()
+        if isinstance(index, int) and 0 <= index < count and mood in MOODS:
+            results[index] = (mood, str(item.get('reason') or '')[:2000], normalize_trigger(item.get('trigger')))
+    return results
+
+
+async def analyze_moods(sessions):
+    """One completion for several finished conversations; missing entries are absent from the result."""
+    response = await get_response_async(mood_prompt([transcript(session) for session in sessions]), priority=BACKGROUND)
+    return parse_moods(response, len(sessions))
+
+
+async def write_moods(records):
+    sql, params = record_emotions_batch(records)
+    await execute_async(sql, params)
+
+
+def backoff(attempt):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class MoodQueue:
+    """
+    Background mood analysis for finished conversations.
+
+    submit() only enqueues. A fixed pool of worker tasks takes up to batch_size
+    conversations at a time, analyses them in one completion and records the
+    results in one SQL batch. Conversations the analysis fails or skips are
+    retried with jittered exponential backoff, up to max_attempts times.
+    """
+
+    def __init__(self, analyze=analyze_moods, write=write_moods, workers=MOOD_WORKERS, batch_size=BATCH_SIZE,
+                 max_attempts=MAX_ATTEMPTS, max_pending=1000):
+        self.analyze = analyze
+        self.write = write
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._queue = asyncio.Queue(max_pending)
+        self._tasks = []
+        self._retries = set()
+        self._pending = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, user_id, session):
+        self._pending += 1
+        await self._queue.put((user_id, session, 0))
+
+    async def close(self, timeout=30):
+        """Give queued conversations up to ``timeout`` seconds to finish, then stop the workers."""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._pending:
+            logger.warning("Dropping mood analysis for %d sessions at shutdown", self._pending)
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + BATCH_LINGER
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+            except Exception:
+                logger.exception("Dropping mood analysis for %d sessions", len(batch))
+                self._pending -= len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _process(self, batch):
+        try:
+            results = await self.analyze([session for _, session, _ in batch])
+        except Exception as e:
+            logger.warning("Mood analysis failed for %d sessions: %s", len(batch), e)
+            self._retry(batch)
+            return
+        done = [(job, results[idx]) for idx, job in enumerate(batch) if idx in results]
+        self._retry([job for idx, job in enumerate(batch) if idx not in results])
+        if not done:
+            return
+        records = [(user_id, reason, mood, trigger) for (user_id, _, _), (mood, reason, trigger) in done]
+        for attempt in range(self.max_attempts):
+            try:
+                await self.write(records)
+                break
+            except Exception as e:
+                if attempt + 1 == self.max_attempts:
+                    logger.error("Giving up recording %d moods: %s", len(records), e)
+                    break
+                await asyncio.sleep(backoff(attempt))
+        self._pending -= len(done)
+
+    def _retry(self, jobs):
+        for user_id, session, attempt in jobs:
+            if attempt + 1 >= self.max_attempts:
+                logger.error("Giving up mood analysis for session %s", session.session_id)
+                self._pending -= 1
+                continue
+            task = asyncio.create_task(self._requeue((user_id, session, attempt + 1), backoff(attempt)))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, job, delay):
+        await asyncio.sleep(delay)
+        await self._queue.put(job)
+
+
+mood_queue = MoodQueue()
@@ -0,0 +1,120 @@
+import math
+import re
+from collections import defaultdict
+import numpy as np
+
+# Share of the fused score that comes from BM25; the rest is cosine similarity.
+LEXICAL_WEIGHT = 0.3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to was were "
+    "will with you your we they he she i who what when where which how all any can may must should".split()
+)
+
+
+def job_document(job):
+    """Text of a listing for lexical matching: title plus its highlights (or description)."""
+    parts = [job.get('title', '')]
+    for info in job.get('job_highlights', []):
+        parts.extend(info.get('items', []))
+    if len(parts) == 1:
+        parts.append(job.get('description', ''))
+    return '\n'.join(parts)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+class BM25Index:
+    """
+    Inverted index over documents for Okapi BM25.
+
+    Postings are kept per term as parallel (doc id, term frequency) arrays, so
+    scoring a query only touches the postings of its own terms and each term is
+    one vectorized update over the score array.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(lambda: ([], []))
+        self._arrays = {}
+        self._doc_len = []
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def add(self, text):
+        """Index a document and return its id (ids are assigned in insertion order)."""
+        doc_id = len(self._doc_len)
+        counts = defaultdict(int)
+        for token in tokenize(text):
+            counts[token] += 1
+        for term, tf in counts.items():
+            ids, tfs = self._postings[term]
+            ids.append(doc_id)
+            tfs.append(tf)
+            self._arrays.pop(term, None)
+        length = sum(counts.values())
+        self._doc_len.append(length)
+        self._total_len += length
+        return doc_id
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            ids, tfs = self._postings[term]
+            arrays = self._arrays[term] = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+        return arrays
+
+    def scores(self, query):
+        """BM25 score of every document for ``query``, as a float32 array."""
+        n_docs = len(self._doc_len)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        if not n_docs:
+            return scores
+        doc_len = np.asarray(self._doc_len, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(self._total_len / n_docs, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            ids, tfs = self._term_arrays(term)
+            idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+        return scores
+
+
+def min_max(values):
+    if not len(values):
+        return values
+    low, high = values.min(), values.max()
+    if high - low < 1e-9:
+        return np.zeros_like(values)
+    return (values - low) / (high - low)
+
+
+def fuse_scores(cosine, lexical, weight=LEXICAL_WEIGHT):
+    """
+    Blend cosine similarity and BM25 over the same candidates. Both are
+    min-max scaled first: ada cosines sit in a narrow band and BM25 is
+    unbounded, so raw values would let one side swamp the other.
+    """
+    return (1 - weight) * min_max(cosine) + weight * min_max(lexical)
+
+
+def hybrid_rank(query_text, query_vector, doc_vectors, bm25, mask=None, weight=LEXICAL_WEIGHT):
+    """
+    Fused score of every document; rows where ``mask`` is False get -inf.
+
+    ``doc_vectors`` must already be L2-normalized, so cosine similarity is one
+    matrix-vector product; only the query is normalized here.
+    """
+    query_vector = np.asarray(query_vector, dtype=np.float32)
+    query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-9)
+    scores = fuse_scores(doc_vectors @ query_vector, bm25.scores(query_text), weight).astype(np.float32)
+    if mask is not None:
+        scores[~np.asarray(mask, dtype=bool)] = -np.inf
+    return scores
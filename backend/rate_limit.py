@@ -0,0 +1,230 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from metrics import Counter, Histogram
+
+# Priority classes, most urgent first.
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+# Share of the token bucket each class must leave untouched, so a burst of batch
+# or background work can't spend the quota interactive requests need next.
+RESERVE = {INTERACTIVE: 0.0, BATCH: 0.1, BACKGROUND: 0.25}
+
+queue_seconds = Histogram('llm_queue_seconds', 'Time calls waited for quota and a concurrency slot.',
+                          ['limiter', 'priority'])
+throttled_total = Counter('llm_throttled_total', 'Calls rejected with HTTP 429.', ['limiter', 'priority'])
+
+
+def is_throttled(error):
+    return getattr(error, 'status_code', None) == 429
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, from Retry-After(-Ms) headers, if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+class Ticket:
+    """A granted call. Set ``used`` to the tokens the call really consumed before releasing."""
+
+    __slots__ = ('cost', 'priority', 'used', 'started', 'granted', 'cancelled', '_wake')
+
+    def __init__(self, cost, priority, wake):
+        self.cost = cost
+        self.priority = priority
+        self.used = None
+        self.started = None
+        self.granted = False
+        self.cancelled = False
+        self._wake = wake
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus adaptive concurrency limit for one API quota.
+
+    The bucket holds up to ``tokens_per_minute`` and refills continuously. Each
+    call reserves its estimated tokens and one concurrency slot, waiting in a
+    priority queue until both are available; the estimate is reconciled with
+    the real usage on release. The concurrency limit follows AIMD: it grows by
+    about one per round of successful calls and halves on a 429 or when latency
+    exceeds ``latency_target``. Usable from threads and from coroutines.
+    """
+
+    def __init__(self, name, tokens_per_minute, max_concurrency=32, min_concurrency=1, initial_concurrency=8,
+                 latency_target=15.0, max_retries=5, backoff_base=1.0, backoff_max=30.0):
+        self.name = name
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._timer_at = None
+
+    def acquire(self, tokens, priority=BATCH):
+        event = threading.Event()
+        ticket = self._enqueue(tokens, priority, event.set)
+        event.wait()
+        return ticket
+
+    async def acquire_async(self, tokens, priority=INTERACTIVE):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+        ticket = self._enqueue(tokens, priority, wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket.granted:
+                    self._release_locked(ticket, throttled=False, latency=0.0)
+                else:
+                    ticket.cancelled = True
+            raise
+        return ticket
+
+    def release(self, ticket, throttled=False):
+        with self._lock:
+            self._release_locked(ticket, throttled, time.monotonic() - ticket.started)
+
+    def backoff(self, attempt, error=None):
+        delay = retry_after(error) if error is not None else None
+        if delay is None:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        # Full jitter on top of the server's hint, so throttled callers don't return in lockstep.
+        return delay + random.uniform(0, delay)
+
+    def call(self, fn, tokens, priority=BATCH):
+        """Run ``fn(ticket)`` under the limiter, retrying 429s with jittered backoff."""
+        for attempt in range(self.max_retries + 1):
+            ticket = self.acquire(tokens, priority)
+            try:
+                result = fn(ticket)
+            except Exception as e:
+                self.release(ticket, throttled=is_throttled(e))
+                if not is_throttled(e) or attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(ticket)
+                raise
+            self.release(ticket)
+            return result
+
+    async def call_async(self, fn, tokens, priority=INTERACTIVE):
+        """Await ``fn(ticket)`` under the limiter, retrying 429s with jittered backoff."""
+        for attempt in range(self.max_retries + 1):
+            ticket = await self.acquire_async(tokens, priority)
+            try:
+                result = await fn(ticket)
+            except Exception as e:
+                self.release(ticket, throttled=is_throttled(e))
+                if not is_throttled(e) or attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(ticket)
+                raise
+            self.release(ticket)
+            return result
+
+    def _enqueue(self, tokens, priority, wake):
+        ticket = Ticket(tokens, priority, wake)
+        ticket.started = time.monotonic()
+        with self._lock:
+            heapq.heappush(self._heap, (priority, next(self._seq), ticket))
+            self._dispatch()
+        return ticket
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        self._refill()
+        while self._heap and self._in_flight < max(self.min_concurrency, int(self.limit)):
+            ticket = self._heap[0][2]
+            if ticket.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            reserve = RESERVE[ticket.priority] * self.capacity
+            # A call bigger than the whole bucket still runs once the bucket is full.
+            cost = min(ticket.cost, self.capacity - reserve)
+            if self._tokens - cost < reserve:
+                self._wake_at(time.monotonic() + (reserve + cost - self._tokens) / self.rate)
+                return
+            heapq.heappop(self._heap)
+            self._tokens -= cost
+            self._in_flight += 1
+            queue_seconds.observe(time.monotonic() - ticket.started, limiter=self.name,
+                                  priority=PRIORITY_NAMES[ticket.priority])
+            ticket.cost = cost
+            ticket.granted = True
+            ticket.started = time.monotonic()
+            ticket._wake()
+
+    def _wake_at(self, when):
+        if self._timer is not None and self._timer_at <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(0.0, when - time.monotonic()), self._on_timer)
+        self._timer.daemon = True
+        self._timer_at = when
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _release_locked(self, ticket, throttled, latency):
+        self._in_flight -= 1
+        if ticket.used is not None:
+            # Refund an overestimate, or take the overrun out of the bucket.
+            self._tokens = min(self.capacity, self._tokens + ticket.cost - ticket.used)
+        if throttled:
+            throttled_total.inc(limiter=self.name, priority=PRIORITY_NAMES[ticket.priority])
+            # The server says the quota is spent whatever our bucket thinks.
+            self._tokens = min(self._tokens, 0.0)
+            self._decrease()
+        elif latency > self.latency_target:
+            self._decrease()
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def _decrease(self):
+        # At most one halving per second, so one burst of failures counts once.
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self._last_decrease = now
@@ -0,0 +1,208 @@
+import base64
+import json
+import logging
+import os
+import threading
+import numpy as np
+from assistant import get_embeddings, BATCH, BACKGROUND
+from cache import LRUCache, SqliteStore
+from embedding_cache import encode_vector, decode_vector
+from cosmos_db import get_profile
+from job_classifier import classify_jobs
+from job_index import job_index, job_key, normalize_rows
+from singleflight import SingleFlight
+from utils import process_jobs
+
+RECOMMENDATIONS_K = 10
+# /recommended_jobs doesn't read profile['disability'] yet; precomputed lists use the same value.
+DEFAULT_DISABILITY = 'autism'
+
+# Recommendations per (search, location, profile version) are reused for this
+# many seconds, so a burst of identical requests costs one computation.
+RECOMMENDATION_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", "30"))
+recommendation_cache = LRUCache(maxsize=1024, ttl=RECOMMENDATION_TTL)
+_recommendation_flights = SingleFlight()
+
+logger = logging.getLogger(__name__)
+
+
+def encode_record(record):
+    return json.dumps(dict(record, embedding=base64.b64encode(encode_vector(record['embedding'])).decode('ascii')))
+
+
+def decode_record(blob):
+    record = json.loads(blob)
+    record['embedding'] = decode_vector(base64.b64decode(record['embedding']))
+    return record
+
+
+# Precomputed recommendations per profile id. Each record holds the profile ETag
+# and disability it was computed for, the summary and its normalized embedding
+# (the query), the keys of the candidates it was ranked from, the lowest cosine
+# and BM25 score among those candidates (None if the corpus had fewer than were
+# asked for), and the ranked jobs.
+recommendation_store = SqliteStore(os.getenv("RECOMMENDATION_STORE_PATH", "recommendations.sqlite"),
+                                   "profile_recommendations", encode=encode_record, decode=decode_record)
+
+
+def precompute(profile, disability=DEFAULT_DISABILITY, k=RECOMMENDATIONS_K, priority=BATCH):
+    """
+    Rank the job corpus for a profile: top-k listings by fused BM25 and cosine
+    similarity to its summary, keeping only jobs feasible for the disability.
+    """
+    summary = profile['summary']
+    vector = normalize_rows(get_embeddings([summary], priority)[0])
+    # Over-fetch so filtering out infeasible jobs still leaves k to return.
+    candidates = job_index.search(vector, k * 3, query_text=summary)
+    keys = [job_key(job) for job, _ in candidates]
+    floors = None
+    if len(candidates) == k * 3:
+        cosine, lexical = job_index.score_listings(keys, vector[None], [summary])
+        floors = [float(cosine.min()), float(lexical.min())]
+    feasible = classify_jobs([job for job, _ in candidates], disability, priority)
+    jobs = [dict(job, user_sim_score=score) for (job, score), ok in zip(candidates, feasible) if ok]
+    return {'etag': profile.get('_etag'), 'disability': disability, 'summary': summary, 'embedding': vector,
+            'candidates': keys, 'floors': floors, 'jobs': jobs[:k]}
+
+
+def is_current(record, profile, disability):
+    return record is not None and record['etag'] == profile.get('_etag') and record['disability'] == disability
+
+
+def get_recommendations(profile, job_title, location, disability=DEFAULT_DISABILITY, k=RECOMMENDATIONS_K):
+    """
+    Recommended jobs for a profile.
+
+    Normally a single read of the precomputed list. If there is none for this
+    version of the profile, it is computed here, shared between concurrent
+    identical requests and stored. Callers must not modify the returned list.
+    """
+    record = recommendation_store.get(profile['id'])
+    if is_current(record, profile, disability):
+        return record['jobs']
+    key = (job_title, location, disability, profile['id'], profile.get('_etag'))
+    cached = recommendation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def compute():
+        if not len(job_index):
+            # Cold corpus (first boot before the refresh task finishes): search live once.
+            jobs = process_jobs(profile['summary'], job_title, location, disability)
+        else:
+            record = precompute(profile, disability, k)
+            recommendation_store.set(profile['id'], record)
+            jobs = record['jobs']
+        recommendation_cache.set(key, jobs)
+        return jobs
+    return _recommendation_flights.do(key, compute)
+
+
+class RecommendationRefresher:
+    """
+    Keeps precomputed recommendations current in a background thread.
+
+    profile_changed() recomputes one profile, unless its stored list already
+    matches the profile's ETag. jobs_changed() recomputes only the profiles a
+    batch of new or changed listings touches: those the listings were
+    candidates for, or could be now because a listing beats the weakest
+    candidate cosine or BM25 score the profile's list was ranked from.
+    """
+
+    def __init__(self, load_profile, store=recommendation_store, disability=DEFAULT_DISABILITY,
+                 k=RECOMMENDATIONS_K):
+        self.load_profile = load_profile
+        self.store = store
+        self.disability = disability
+        self.k = k
+        self._profiles = {}
+        self._job_keys = set()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def profile_changed(self, profile):
+        self._submit(lambda: self._profiles.__setitem__(profile['id'], profile))
+
+    def jobs_changed(self, keys):
+        if keys:
+            self._submit(lambda: self._job_keys.update(keys))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+
+    def _submit(self, add):
+        with self._cond:
+            if self._closed:
+                return
+            add()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="recommendation-refresher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._profiles or self._job_keys)
+                if self._closed:
+                    return
+                keys, self._job_keys = self._job_keys, set()
+            if keys:
+                try:
+                    affected = self._affected_profiles(keys)
+                except Exception:
+                    logger.exception("Failed to match %d changed listings to profiles", len(keys))
+                    affected = []
+                with self._cond:
+                    for profile_id in affected:
+                        # None: load the profile when its turn comes.
+                        self._profiles.setdefault(profile_id, None)
+            while True:
+                with self._cond:
+                    if self._closed or not self._profiles:
+                        break
+                    profile_id = next(iter(self._profiles))
+                    profile = self._profiles.pop(profile_id)
+                self._refresh(profile_id, profile, force=profile is None)
+
+    def _affected_profiles(self, keys):
+        keys = list(keys)
+        changed = set(keys)
+        affected, unmatched = [], []
+        for profile_id, record in self.store.items():
+            if record.get('floors') is None or not changed.isdisjoint(record['candidates']):
+                affected.append(profile_id)
+            else:
+                unmatched.append((profile_id, record))
+        if not unmatched:
+            return affected
+        # Min-max scaling maps every listing's cosine and BM25 through the same
+        # increasing functions, so a listing below the lowest of both among a
+        # profile's candidates can't outrank any of them under the fused score.
+        cosine, lexical = job_index.score_listings(keys, np.stack([record['embedding'] for _, record in unmatched]),
+                                                   [record['summary'] for _, record in unmatched])
+        for (profile_id, record), cos, lex in zip(unmatched, cosine, lexical):
+            cosine_floor, lexical_floor = record['floors']
+            if (cos >= cosine_floor).any() or (lex > lexical_floor).any():
+                affected.append(profile_id)
+        return affected
+
+    def _refresh(self, profile_id, profile, force):
+        try:
+            if profile is None:
+                profile = self.load_profile(profile_id)
+            if not force and is_current(self.store.get(profile_id), profile, self.disability):
+                return
+            if not len(job_index):
+                return
+            self.store.set(profile_id, precompute(profile, self.disability, self.k, BACKGROUND))
+        except Exception:
+            logger.exception("Failed to precompute recommendations for profile %s", profile_id)
+
+
+recommendation_refresher = RecommendationRefresher(get_profile)
@@ -1,3 +1,10 @@
+import asyncio
+import copy
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
 from docx import Document
 from docx.shared import RGBColor
 from docx.shared import Pt
@@ -5,6 +12,38 @@ from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+RESUME_WORKERS = int(os.getenv("RESUME_WORKERS", "2"))
+
+
+@lru_cache(maxsize=1)
+def template_bytes():
+    """An empty, pre-styled document (Calibri 10 as Normal), built once per process."""
+    doc = Document()
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = Pt(10)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def bottom_border():
+    """Paragraph border XML used as a horizontal rule; copied into each paragraph that needs one."""
+    pBdr = OxmlElement('w:pBdr')
+    bottom = OxmlElement('w:bottom')
+    bottom.set(qn('w:val'), 'single')
+    bottom.set(qn('w:sz'), '6')
+    bottom.set(qn('w:space'), '1')
+    bottom.set(qn('w:color'), 'auto')
+    pBdr.append(bottom)
+    return pBdr
+
+
+def add_bottom_border(paragraph):
+    paragraph._p.get_or_add_pPr().append(copy.deepcopy(bottom_border()))
+
 
 def add_heading_with_hr(doc, heading_text):
     """
@@ -20,15 +59,7 @@ def add_heading_with_hr(doc, heading_text):
     p_heading.paragraph_format.space_after = Pt(2)
 
     # Add a bottom border to the heading (acts as a horizontal rule)
-    pPr = p_heading._p.get_or_add_pPr()
-    pBdr = OxmlElement('w:pBdr')
-    bottom = OxmlElement('w:bottom')
-    bottom.set(qn('w:val'), 'single')
-    bottom.set(qn('w:sz'), '6')
-    bottom.set(qn('w:space'), '1')
-    bottom.set(qn('w:color'), 'auto')
-    pBdr.append(bottom)
-    pPr.append(pBdr)
+    add_bottom_border(p_heading)
 
 
 def add_header(doc, user_details):
@@ -56,25 +87,13 @@ def add_header(doc, user_details):
     hr_para = doc.add_paragraph()
     hr_para.paragraph_format.space_before = Pt(2)
     hr_para.paragraph_format.space_after = Pt(2)
-    pPr = hr_para._p.get_or_add_pPr()
-    pBdr = OxmlElement('w:pBdr')
-    bottom = OxmlElement('w:bottom')
-    bottom.set(qn('w:val'), 'single')
-    bottom.set(qn('w:sz'), '6')
-    bottom.set(qn('w:space'), '1')
-    bottom.set(qn('w:color'), 'auto')
-    pBdr.append(bottom)
-    pPr.append(pBdr)
+    add_bottom_border(hr_para)
 
 
-def create_resume(user_details, output_file='resume.docx'):
-    # Create a new Document
-    doc = Document()
-
-    # Set default font style for the document (Calibri, 10)
-    style = doc.styles['Normal']
-    style.font.name = 'Calibri'
-    style.font.size = Pt(10)
+def render_resume(user_details):
+    """Render the resume and return the .docx file contents as bytes."""
+    # Start from the pre-styled template (Calibri, 10) instead of styling a new Document
+    doc = Document(BytesIO(template_bytes()))
 
     # Add header with name and contact info
     add_header(doc, user_details)
@@ -162,9 +181,39 @@ def create_resume(user_details, output_file='resume.docx'):
     add_section('Skills', add_skills)
     add_section('Work Experience', add_work_experience)
 
-    # Save the document
-    doc.save(output_file)
-    print(f"Resume saved as {output_file}")
+    # Save the document to memory; nothing touches the disk
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+_pool = None
+
+
+def get_render_pool():
+    global _pool
+    if _pool is None:
+        # By now the app runs other threads (SQL pool, conversation writer, limiter
+        # timers); forking it could leave a child stuck on a lock held at fork
+        # time, so workers start from a clean forkserver (spawn where unavailable).
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        # Workers build their template on start so the first render doesn't pay for it.
+        _pool = ProcessPoolExecutor(max_workers=RESUME_WORKERS, initializer=template_bytes,
+                                    mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+async def render_resume_async(user_details):
+    """render_resume in the process pool, so python-docx work never runs on an API worker."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_pool(), render_resume, user_details)
+
+
+def shutdown_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
 
 
 # if __name__ == '__main__':
@@ -206,4 +255,5 @@ def create_resume(user_details, output_file='resume.docx'):
 #         ]
 #     }
 #
-#     create_resume(user_details)
+#     with open('resume.docx', 'wb') as f:
+#         f.write(render_resume(user_details))
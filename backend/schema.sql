@@ -0,0 +1,50 @@
+-- Indexes and tables the backend expects on top of the Employees and eMOTION tables.
+
+-- Keyset pagination on /emotions, globally and per user.
+CREATE INDEX IX_eMOTION_created ON eMOTION (created_date DESC, id DESC);
+CREATE INDEX IX_eMOTION_user_created ON eMOTION (user_id, created_date DESC, id DESC);
+
+-- Dashboard rollups, maintained by emotions.RECORD_EMOTIONS_BATCH_SQL in the
+-- same transaction as the eMOTION inserts.
+CREATE TABLE EmotionDaily (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    mood NVARCHAR(200) NOT NULL,
+    entries INT NOT NULL,
+    CONSTRAINT PK_EmotionDaily PRIMARY KEY (user_id, day, mood)
+);
+
+CREATE TABLE EmotionDailyTrigger (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    mood NVARCHAR(200) NOT NULL,
+    trigger_category NVARCHAR(100) NOT NULL,
+    entries INT NOT NULL,
+    CONSTRAINT PK_EmotionDailyTrigger PRIMARY KEY (user_id, day, mood, trigger_category)
+);
+
+CREATE TABLE EmotionLatest (
+    user_id INT NOT NULL CONSTRAINT PK_EmotionLatest PRIMARY KEY,
+    mood NVARCHAR(200) NOT NULL,
+    reason NVARCHAR(2000) NULL,
+    trigger_category NVARCHAR(100) NOT NULL,
+    created_date DATETIME NOT NULL
+);
+
+-- One-off backfill from existing records (triggers were not recorded before the rollups).
+INSERT INTO EmotionDaily (user_id, day, mood, entries)
+SELECT user_id, CAST(created_date AS DATE), emotion, COUNT(*)
+FROM eMOTION GROUP BY user_id, CAST(created_date AS DATE), emotion;
+
+INSERT INTO EmotionDailyTrigger (user_id, day, mood, trigger_category, entries)
+SELECT user_id, CAST(created_date AS DATE), emotion, 'other', COUNT(*)
+FROM eMOTION GROUP BY user_id, CAST(created_date AS DATE), emotion;
+
+INSERT INTO EmotionLatest (user_id, mood, reason, trigger_category, created_date)
+SELECT user_id, emotion, reason, 'other', created_date
+FROM (
+    SELECT user_id, emotion, reason, created_date,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_date DESC, id DESC) AS rn
+    FROM eMOTION
+) latest
+WHERE rn = 1;
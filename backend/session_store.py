@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from models import ChatSession
+
+SESSION_TIMEOUT = 60
+
+
+class InMemorySessionBackend:
+    """
+    Sessions held in this process.
+
+    Expiry uses a min-heap of (deadline, session_id). Touching a session pushes a
+    fresh entry instead of searching the heap; superseded entries are dropped
+    lazily when they surface, so a sweep only costs O(expired * log n).
+    """
+
+    # Every operation is a dict or heap update, cheap enough for the event loop.
+    blocking = False
+
+    def __init__(self):
+        self._sessions = {}
+        self._deadlines = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        return self._sessions.get(session_id)
+
+    def save(self, session, deadline):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._deadlines[session.session_id] = deadline
+            heapq.heappush(self._heap, (deadline, session.session_id))
+
+    def pop_expired(self, now):
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, session_id = heapq.heappop(self._heap)
+                if self._deadlines.get(session_id) != deadline:
+                    continue
+                del self._deadlines[session_id]
+                expired.append(self._sessions.pop(session_id))
+        return expired
+
+
+class SqliteSessionBackend:
+    """
+    Sessions in a local SQLite file, shared by every worker on the host.
+
+    The deadline column is indexed, so a sweep is a range scan over the expired
+    rows only. Expired rows are claimed and deleted in one write transaction,
+    so exactly one worker ends each session.
+    """
+
+    # Calls wait on the file lock (up to the 10s busy timeout) when workers contend.
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(session_id TEXT PRIMARY KEY, deadline REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_deadline ON sessions (deadline)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._conn().execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return None if row is None else ChatSession.from_json(row[0])
+
+    def save(self, session, deadline):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, deadline, data) VALUES (?, ?, ?)",
+            (session.session_id, deadline, session.to_json())
+        )
+
+    def pop_expired(self, now, limit=100):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT session_id, data FROM sessions WHERE deadline <= ? ORDER BY deadline LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(row[0],) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [ChatSession.from_json(row[1]) for row in rows]
+
+
+class SessionManager:
+    """
+    Stores chat sessions and expires them SESSION_TIMEOUT seconds after their last activity.
+
+    Methods are coroutines: a blocking backend runs in a worker thread so a
+    contended session file never stalls the event loop.
+    """
+
+    def __init__(self, backend, timeout=SESSION_TIMEOUT):
+        self.backend = backend
+        self.timeout = timeout
+
+    async def _call(self, func, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get(self, session_id):
+        return await self._call(self.backend.get, session_id)
+
+    async def save(self, session):
+        """Persist the session and push its deadline out; call after every change."""
+        await self._call(self.backend.save, session, session.last_activity.timestamp() + self.timeout)
+
+    async def pop_expired(self):
+        """Remove and return every session whose idle deadline has passed."""
+        return await self._call(self.backend.pop_expired, time.time())
+
+
+def create_backend():
+    backend = os.getenv("SESSION_BACKEND", "memory")
+    if backend == "sqlite":
+        return SqliteSessionBackend(os.getenv("SESSION_DB_PATH", "sessions.sqlite"))
+    if backend == "memory":
+        return InMemorySessionBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+session_manager = SessionManager(create_backend())
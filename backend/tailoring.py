@@ -0,0 +1,60 @@
+import ast
+import re
+from assistant import get_response_async, forget_response, BATCH
+
+_LIST_RE = re.compile(r"\[([^\[\]]*)\]")
+
+
+def tailor_prompt(profile, jd):
+    return [{'role': 'user', "content":
+             f"Here's a Job description : {jd} "
+             f"Here's a user profile in json format:  "
+             f"{profile['skills']} \n {profile['work_experience']} \n {profile['summary']}"
+             f"Your job is tailor the resume according to the Job description. make sure it is curated not very generic."
+             f"you will return skills, work experience points and summary in the following format"
+             f"[summary]*[skill1, skill2, skill3]*[[job1 point 1, job1 point 2], [job2 point1, job2 point2]]"}]
+
+
+def parse_list(text):
+    """A list literal from the model, tolerating unquoted items."""
+    try:
+        value = ast.literal_eval(text.strip())
+        if isinstance(value, (list, tuple)):
+            return list(value)
+    except (ValueError, SyntaxError):
+        pass
+    return [item.strip().strip('\'"') for item in text.strip().strip('[]').split(',') if item.strip()]
+
+
+def parse_nested_list(text):
+    try:
+        value = ast.literal_eval(text.strip())
+        if isinstance(value, (list, tuple)):
+            return [list(item) if isinstance(item, (list, tuple)) else [item] for item in value]
+    except (ValueError, SyntaxError):
+        pass
+    return [parse_list(group) for group in _LIST_RE.findall(text)]
+
+
+def parse_tailored(response):
+    """Split the model's ``[summary]*[skills]*[[points], ...]`` answer into its parts."""
+    summary, skills, jobs = response.split('*', 2)
+    return summary.strip().strip('[]').strip(), parse_list(skills), parse_nested_list(jobs)
+
+
+async def tailor_profile(profile, jd):
+    """Return a copy of the profile rewritten for the job description."""
+    prompt = tailor_prompt(profile, jd)
+    response = await get_response_async(prompt, cache=True, priority=BATCH)
+    try:
+        summary, skills, jobs = parse_tailored(response)
+    except ValueError:
+        # Don't keep serving a malformed answer from the cache.
+        forget_response(prompt)
+        raise
+    profile = dict(profile, summary=summary, skills=skills)
+    profile['work_experience'] = [
+        dict(job, summary=jobs[idx]) if idx < len(jobs) else job
+        for idx, job in enumerate(profile.get('work_experience', []))
+    ]
+    return profile
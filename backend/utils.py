@@ -1,8 +1,11 @@
-import ast
 from uuid import uuid4
-from job_listings import get_google_listings
-from assistant import get_embeddings, get_response
-import torch
+from models import SYSTEM_MESSAGE
+import numpy as np
+from job_aggregator import aggregate_listings
+from assistant import get_embeddings, BACKGROUND
+from job_classifier import classify_jobs
+from job_index import job_index, normalize_rows
+from ranking import BM25Index, hybrid_rank, job_document
 
 
 def generate_session_id() -> str:
@@ -16,7 +19,7 @@ def process_session(session):
         "role": session.role,
         "created_at": session.created_at.isoformat() + "Z",
         "last_activity": session.last_activity.isoformat() + "Z",
-        "messages": session.messages
+        "messages": [SYSTEM_MESSAGE] + [turn.as_dict() for turn in session.messages]
     }
 
 
@@ -35,27 +38,34 @@ def get_desc_str(highlights):
 
 
 def process_jobs(user_summary, job_title, location, disability):
-    jobs = get_google_listings(job_title, location)
-    desc_strs = [get_desc_str(job['job_highlights']) for job in jobs]
-    embeddings_obj = get_embeddings(desc_strs)
-    prompt = [{'role': 'user', 'content': f'Here is a person with disability {disability}. You will be give job'
-                                          f'description in form of a list. review each job description and see if the user '
-                                          f'can perform the described job. You will return all the jobs '
-                                          f'user can the user perform with a reasonable accommodation in the form of list of indexes.'
-                                          f'You will return just a list and no surrounding text just the list'
-                                          f'use 0 based index.'
-                                          f'eg: [1, 3, 5, 6]'}]
-    response = get_response(prompt)
-    relevant_jobs = ast.literal_eval(response)
-    user_summary_embedding = torch.tensor(get_embeddings([user_summary]).data[0].embedding)
-    embeddings = [item.embedding for item in embeddings_obj.data]
-    embeddings = torch.tensor(embeddings)
-    scores = (embeddings @ user_summary_embedding)
+    # Copy so scoring doesn't write into the shared listings cache.
+    jobs = [dict(job) for job in aggregate_listings(job_title, location)]
+    if not jobs:
+        return []
+    desc_strs = [get_desc_str(job.get('job_highlights', [])) for job in jobs]
+    embeddings = get_embeddings(desc_strs)
+    feasible = np.asarray(classify_jobs(jobs, disability), dtype=bool)
+    user_summary_embedding = get_embeddings([user_summary])[0]
+    bm25 = BM25Index()
+    for job in jobs:
+        bm25.add(job_document(job))
+    scores = hybrid_rank(user_summary, user_summary_embedding, normalize_rows(embeddings), bm25, mask=feasible)
     for idx, job in enumerate(jobs):
-        if idx not in relevant_jobs:
-            jobs[idx]['user_sim_score'] = -1
-        else:
-            jobs[idx]['user_sim_score'] = scores[idx]
+        job['user_sim_score'] = float(scores[idx]) if feasible[idx] else -1
     return sorted(jobs, key=lambda x : x['user_sim_score'], reverse=True)
 
 
+def refresh_job_index(job_title, location):
+    """
+    Fetch listings for a search, embed them and add them to the persistent job
+    corpus. Returns the keys of the listings that were new or changed.
+    """
+    jobs = aggregate_listings(job_title, location)
+    if not jobs:
+        return []
+    desc_strs = [get_desc_str(job.get('job_highlights', [])) for job in jobs]
+    changed = job_index.add(jobs, get_embeddings(desc_strs, priority=BACKGROUND))
+    if changed:
+        job_index.save()
+    return changed
+
@@ -1,5 +1,6 @@
 
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, TooltipProps } from 'recharts';
 import { TrendingUp, TrendingDown, Minus } from 'lucide-react';
@@ -10,8 +11,22 @@ interface EmotionDataPoint {
   rawEmotion: 'negative' | 'neutral' | 'positive';
 }
 
+interface DailyMood {
+  user_id: number;
+  day: string;
+  mood: string;
+  entries: number;
+}
+
+interface DailyMoodResponse {
+  status: string;
+  data: DailyMood[];
+}
+
 interface EmotionalToneTimelineProps {
-  emotionData: EmotionDataPoint[];
+  // Without emotionData the timeline loads the per-day mood counts itself
+  emotionData?: EmotionDataPoint[];
+  employeeId?: string;
   loading?: boolean;
   hideCard?: boolean;
   className?: string;
@@ -29,6 +44,36 @@ const getTrendInfo = (data: EmotionDataPoint[]) => {
   return { icon: Minus, text: 'Stable', color: 'text-blue-500' };
 };
 
+const getMoodScore = (mood: string) => {
+  switch (mood.toLowerCase()) {
+    case 'excited':
+      return 1;
+    case 'neutral':
+      return 0;
+    default:
+      return -1;
+  }
+};
+
+// One point per day: the average mood of that day's records
+const toTimeline = (rows: DailyMood[]): EmotionDataPoint[] => {
+  const days = new Map<string, { total: number; entries: number }>();
+  rows.forEach(row => {
+    const day = days.get(row.day) ?? { total: 0, entries: 0 };
+    day.total += getMoodScore(row.mood) * row.entries;
+    day.entries += row.entries;
+    days.set(row.day, day);
+  });
+  return Array.from(days, ([date, { total, entries }]) => {
+    const score = entries ? total / entries : 0;
+    return {
+      date,
+      value: Math.round(50 + score * 50),
+      rawEmotion: score > 0.33 ? 'positive' : score < -0.33 ? 'negative' : 'neutral'
+    };
+  });
+};
+
 // Custom tooltip for the chart
 const CustomTooltip = ({ active, payload, label }: TooltipProps<number, string>) => {
   if (active && payload && payload.length) {
@@ -59,14 +104,40 @@ const CustomTooltip = ({ active, payload, label }: TooltipProps<number, string>)
 
 export const EmotionalToneTimeline: React.FC<EmotionalToneTimelineProps> = ({ 
   emotionData,
+  employeeId,
   loading = false,
   hideCard = false,
   className = ''
 }) => {
-  const trendInfo = getTrendInfo(emotionData);
+  const [dailyData, setDailyData] = useState<EmotionDataPoint[]>([]);
+  const [fetching, setFetching] = useState(!emotionData);
+
+  useEffect(() => {
+    if (emotionData) return;
+    const fetchDailyMoods = async () => {
+      setFetching(true);
+      try {
+        const response = await axios.get<DailyMoodResponse>('http://127.0.0.1:8000/emotions/daily', {
+          params: employeeId ? { user_id: employeeId } : {}
+        });
+        if (response.data.status === 'success') {
+          setDailyData(toTimeline(response.data.data));
+        }
+      } catch (err) {
+        console.error('Error fetching daily moods:', err);
+      } finally {
+        setFetching(false);
+      }
+    };
+
+    fetchDailyMoods();
+  }, [emotionData, employeeId]);
+
+  const points = emotionData ?? dailyData;
+  const trendInfo = getTrendInfo(points);
   
   // Map raw emotions to values for the chart
-  const chartData = emotionData.map(point => ({
+  const chartData = points.map(point => ({
     ...point,
     value: point.rawEmotion === 'positive' ? 100 : 
            point.rawEmotion === 'neutral' ? 50 : 0
@@ -74,14 +145,14 @@ export const EmotionalToneTimeline: React.FC<EmotionalToneTimelineProps> = ({
   
   // Get color based on last emotion
   const getLineColor = () => {
-    const lastEmotion = emotionData.length > 0 ? emotionData[emotionData.length - 1].rawEmotion : 'neutral';
+    const lastEmotion = points.length > 0 ? points[points.length - 1].rawEmotion : 'neutral';
     return lastEmotion === 'positive' ? '#22c55e' : 
            lastEmotion === 'negative' ? '#ef4444' : '#3b82f6';
   };
   
   const chartContent = (
     <>
-      {loading ? (
+      {loading || fetching ? (
         <div className="h-64 flex items-center justify-center">
           <div className="w-6 h-6 border-2 border-primary border-t-transparent rounded-full animate-spin"></div>
         </div>
@@ -16,9 +16,17 @@ interface EmotionData {
   created_date: string;
 }
 
-interface EmotionResponse {
+interface LatestMood {
+  user_id: number;
+  mood: string;
+  reason: string;
+  trigger: string;
+  created_date: string;
+}
+
+interface LatestMoodResponse {
   status: string;
-  data: EmotionData[];
+  data: LatestMood[];
   message?: string;
 }
 
@@ -35,18 +43,26 @@ export const EmployeeMood: React.FC<EmployeeMoodProps> = ({ employeeId }) => {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 5000); // 5 second timeout
 
-        const response = await axios.get<EmotionResponse>('http://127.0.0.1:8000/emotions', {
+        // One row per employee with their latest mood, kept current by the backend
+        const response = await axios.get<LatestMoodResponse>('http://127.0.0.1:8000/emotions/latest', {
           signal: controller.signal
         });
 
         clearTimeout(timeoutId);
 
-        if (response.data.status === 'success' && response.data.data.length > 0) {
-          // Sort by date to get the latest
-          const sortedEmotions = [...response.data.data].sort((a, b) =>
-            new Date(b.created_date).getTime() - new Date(a.created_date).getTime()
-          );
-          setMoodData(sortedEmotions[0]);
+        const moods = response.data.status === 'success' ? response.data.data : [];
+        const latest = employeeId
+          ? moods.find(mood => String(mood.user_id) === employeeId)
+          : [...moods].sort((a, b) =>
+              new Date(b.created_date).getTime() - new Date(a.created_date).getTime()
+            )[0];
+        if (latest) {
+          setMoodData({
+            user_id: latest.user_id,
+            reason: latest.reason,
+            emotion: latest.mood,
+            created_date: latest.created_date
+          });
         } else {
           setError('No mood data available');
         }
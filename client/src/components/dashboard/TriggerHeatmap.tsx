@@ -1,5 +1,6 @@
 
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { 
   ScatterChart, 
@@ -21,11 +22,39 @@ interface TriggerDataPoint {
   z: number; // Size of point (optional)
 }
 
+interface TriggerCount {
+  trigger: string;
+  mood: string;
+  entries: number;
+}
+
+interface TriggerCountResponse {
+  status: string;
+  data: TriggerCount[];
+}
+
 interface TriggerHeatmapProps {
-  triggerData: TriggerDataPoint[];
+  // Without triggerData the map loads the per-trigger mood counts itself
+  triggerData?: TriggerDataPoint[];
+  employeeId?: string;
   loading?: boolean;
 }
 
+// Calmness of a trigger: the share of its records with a neutral or excited mood
+const toTriggerPoints = (rows: TriggerCount[]): TriggerDataPoint[] => {
+  const triggers = new Map<string, { calm: number; entries: number }>();
+  rows.forEach(row => {
+    const trigger = triggers.get(row.trigger) ?? { calm: 0, entries: 0 };
+    if (['neutral', 'excited'].includes(row.mood.toLowerCase())) trigger.calm += row.entries;
+    trigger.entries += row.entries;
+    triggers.set(row.trigger, trigger);
+  });
+  return Array.from(triggers, ([trigger, { calm, entries }], index) => {
+    const calmness = entries ? Math.round((calm / entries) * 100) : 0;
+    return { trigger, calmness, x: index, y: calmness, z: 0 };
+  });
+};
+
 const CustomTooltip = ({ active, payload }: any) => {
   if (active && payload && payload.length) {
     const data = payload[0].payload;
@@ -52,13 +81,40 @@ const CustomTooltip = ({ active, payload }: any) => {
 
 export const TriggerHeatmap: React.FC<TriggerHeatmapProps> = ({
   triggerData,
+  employeeId,
   loading = false
 }) => {
+  const [fetchedData, setFetchedData] = useState<TriggerDataPoint[]>([]);
+  const [fetching, setFetching] = useState(!triggerData);
+
+  useEffect(() => {
+    if (triggerData) return;
+    const fetchTriggers = async () => {
+      setFetching(true);
+      try {
+        const response = await axios.get<TriggerCountResponse>('http://127.0.0.1:8000/emotions/triggers', {
+          params: employeeId ? { user_id: employeeId } : {}
+        });
+        if (response.data.status === 'success') {
+          setFetchedData(toTriggerPoints(response.data.data));
+        }
+      } catch (err) {
+        console.error('Error fetching trigger counts:', err);
+      } finally {
+        setFetching(false);
+      }
+    };
+
+    fetchTriggers();
+  }, [triggerData, employeeId]);
+
+  const points = triggerData ?? fetchedData;
+
   // Get average calmness score
-  const avgCalmness = triggerData.reduce((sum, item) => sum + item.calmness, 0) / triggerData.length;
+  const avgCalmness = points.reduce((sum, item) => sum + item.calmness, 0) / points.length;
   
   // Map points to correct format for ScatterChart
-  const chartData = triggerData.map(point => ({
+  const chartData = points.map(point => ({
     ...point,
     // Size is proportional to calmness (inverse - bigger points for lower calmness)
     z: (100 - point.calmness) / 4 + 10 // Scale for better visibility
@@ -86,7 +142,7 @@ export const TriggerHeatmap: React.FC<TriggerHeatmapProps> = ({
         </div>
       </CardHeader>
       <CardContent>
-        {loading ? (
+        {loading || fetching ? (
           <div className="h-64 flex items-center justify-center">
             <div className="w-6 h-6 border-2 border-primary border-t-transparent rounded-full animate-spin"></div>
           </div>